@@ -0,0 +1,165 @@
+"""
+Stress harness for concurrent checkout on a few "hot" products.
+
+Many buyer threads add the same products to their carts, check out and
+sometimes cancel. The harness reports throughput, latency and time spent
+waiting on row locks, counts deadlocks, and then checks the stock invariants:
+
+* stock never goes negative, and
+* initial stock == current stock + quantity sold in orders that were not cancelled.
+"""
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.db.models import Sum
+
+from carts.models import Order, OrderItem
+from products.models import Category, Product
+from users.models import User
+from .runner import Recorder, Session, percentile
+
+DEADLOCK_SQLSTATE = '40P01'
+
+
+class LockWaitTimer:
+    """
+    ``connection.execute_wrapper`` hook that times SELECT ... FOR UPDATE
+    statements and counts deadlocks.
+    """
+
+    def __init__(self):
+        self.lock_waits_ms = []
+        self.deadlocks = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception as e:
+            if getattr(e.__cause__, 'pgcode', None) == DEADLOCK_SQLSTATE or 'deadlock' in str(e).lower():
+                self.deadlocks += 1
+            raise
+        finally:
+            if 'FOR UPDATE' in sql:
+                self.lock_waits_ms.append((time.perf_counter() - started) * 1000)
+
+
+def create_fixtures(run_id, products, stock, buyers):
+    category, _ = Category.objects.get_or_create(name=f"stress {run_id}")
+    hot_products = Product.objects.bulk_create([
+        Product(
+            name=f"stress {run_id} hot product {i}",
+            description="Hot product used by the checkout stress test.",
+            price=Decimal('10.00'),
+            stock=stock,
+            category=category,
+        )
+        for i in range(products)
+    ])
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(email=f"stress-{run_id}-buyer-{i}@example.com", password=password, name=f"Buyer {i}", phone='1234567890')
+        for i in range(buyers)
+    ])
+    users = list(User.objects.filter(email__startswith=f"stress-{run_id}-buyer-").order_by('id'))
+    return [product.id for product in hot_products], users
+
+
+def buyer_loop(session, product_ids, iterations, max_quantity, cancel_rate, rng, placed_orders):
+    for _ in range(iterations):
+        product_id = rng.choice(product_ids)
+        response = session.request(
+            'POST', 'cart-list', data={'product_id': product_id, 'quantity': rng.randint(1, max_quantity)}
+        )
+        if response.status_code >= 300:
+            continue
+
+        response = session.request('POST', 'order-create')
+        if response.status_code == 201:
+            placed_orders.append(response.json()['id'])
+        else:
+            # Empty the cart so stale lines do not pile up and hold stock.
+            for item in session.request('GET', 'cart-list').json().get('items', []):
+                session.request('DELETE', 'cart-detail', url_kwargs={'pk': item['id']})
+
+        if placed_orders and rng.random() < cancel_rate:
+            session.request('POST', 'order-cancel', url_kwargs={'pk': rng.choice(placed_orders)})
+
+
+def check_invariants(product_ids, initial_stock):
+    sold = dict(
+        OrderItem.objects.filter(product_id__in=product_ids)
+        .exclude(order__status=Order.OrderStatus.CANCELLED)
+        .values('product_id')
+        .annotate(sold=Sum('quantity'))
+        .values_list('product_id', 'sold')
+    )
+    results = {}
+    for product_id, stock in Product.objects.filter(id__in=product_ids).values_list('id', 'stock'):
+        product_sold = sold.get(product_id, 0)
+        results[product_id] = {
+            'initial_stock': initial_stock,
+            'stock': stock,
+            'sold': product_sold,
+            'non_negative': stock >= 0,
+            'conserved': stock + product_sold == initial_stock,
+        }
+    return results
+
+
+def run(run_id, products, stock, buyers, iterations, max_quantity, cancel_rate, rng_factory):
+    product_ids, users = create_fixtures(run_id, products, stock, buyers)
+    recorder = Recorder()
+    timers = []
+    errors = []
+    orders_placed = []
+
+    def worker(index):
+        rng = rng_factory(index)
+        session = Session(users[index], recorder, raise_request_exception=False)
+        timer = LockWaitTimer()
+        timers.append(timer)
+        placed = []
+        try:
+            with connections['default'].execute_wrapper(timer):
+                buyer_loop(session, product_ids, iterations, max_quantity, cancel_rate, rng, placed)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            orders_placed.extend(placed)
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(buyers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if errors:
+        raise errors[0]
+
+    lock_waits = sorted(ms for timer in timers for ms in timer.lock_waits_ms)
+    invariants = check_invariants(product_ids, stock)
+    report = recorder.report(elapsed)
+    report.update({
+        'elapsed_seconds': round(elapsed, 3),
+        'orders_placed': len(orders_placed),
+        'orders_per_second': round(len(orders_placed) / elapsed, 2) if elapsed else None,
+        'deadlocks': sum(timer.deadlocks for timer in timers),
+        'lock_wait_ms': {
+            'statements': len(lock_waits),
+            'total': round(sum(lock_waits), 3),
+            'p50': round(percentile(lock_waits, 0.50), 3) if lock_waits else None,
+            'p95': round(percentile(lock_waits, 0.95), 3) if lock_waits else None,
+            'p99': round(percentile(lock_waits, 0.99), 3) if lock_waits else None,
+            'max': round(lock_waits[-1], 3) if lock_waits else None,
+        },
+        'invariants': {str(product_id): result for product_id, result in invariants.items()},
+        'invariants_hold': all(r['non_negative'] and r['conserved'] for r in invariants.values()),
+    })
+    return report
@@ -0,0 +1,42 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from benchmarks.startup import benchmark
+from .profile_startup import SETTINGS_PROFILES
+
+
+class Command(BaseCommand):
+    help = (
+        "Boots Django repeatedly in fresh interpreters, once per run and settings profile, and "
+        "reports cold-start time, the time of each startup phase and peak RSS per worker as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', choices=SETTINGS_PROFILES, default=list(SETTINGS_PROFILES))
+        parser.add_argument('--runs', type=int, default=10, help="Cold starts per profile.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            report = benchmark(options['profiles'], options['runs'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        report['meta'] = {
+            'finished_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS("\n".join(
+                f"{profile}: cold start p50 {report[profile]['cold_start_ms']['p50']} ms, "
+                f"RSS p50 {report[profile]['rss_kb']['p50']} KB"
+                for profile in options['profiles']
+            ) + f"\nReport written to {options['output']}."))
+        else:
+            self.stdout.write(output)
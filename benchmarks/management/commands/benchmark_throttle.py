@@ -0,0 +1,47 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks.throttle import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures what a throttle check costs: time and cache round trips per check for the "
+        "API's cache-counter throttle and for DRF's timestamp-list throttle, and the latency "
+        "and query count of a request that is rejected by the catalog throttle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checks', type=int, default=10000, help="Throttle checks timed per throttle.")
+        parser.add_argument('--clients', type=int, default=100, help="Distinct client IP addresses.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        run_id = timezone.now().strftime('%Y%m%d%H%M%S%f')
+        # The test client talks to 'testserver'.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            report = run(run_id, options['checks'], options['clients'])
+        report['meta'] = {
+            'run_id': run_id,
+            'checks': options['checks'],
+            'clients': options['clients'],
+            'cache_backend': settings.CACHES['default']['BACKEND'],
+            'database': connection.vendor,
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f"cache counter {report['cache_counter']['latency_us']['p50']} us/check, "
+                f"timestamp list {report['timestamp_list']['latency_us']['p50']} us/check. "
+                f"Report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.startup import profile_imports
+
+SETTINGS_PROFILES = ('full', 'api')
+
+
+class Command(BaseCommand):
+    help = (
+        "Boots Django in a fresh interpreter with -X importtime and reports the time spent "
+        "loading settings, getting the apps ready, building the middleware and importing the "
+        "URLconf, plus the slowest imports by module and by package, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=SETTINGS_PROFILES, default='api',
+                            help="The SETTINGS_PROFILE to boot with.")
+        parser.add_argument('--top', type=int, default=25, help="Number of modules and packages to list.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            report = profile_imports(options['profile'], options['top'])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        report['meta'] = {'profile': options['profile']}
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stdout.write(self.style.SUCCESS(
+                f"Apps ready in {report['phases']['apps_ready_ms']} ms, {report['modules']} modules imported. "
+                f"Report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
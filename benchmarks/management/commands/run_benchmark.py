@@ -0,0 +1,78 @@
+import json
+import math
+import platform
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks.runner import run
+from benchmarks.scenarios import SCENARIOS
+from products.models import Category, Product
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives the API routes in-process with a mix of browse, cart and checkout traffic "
+        "and reports throughput, latency percentiles and queries per request as JSON. "
+        "Run seed_data first; the cart and checkout scenarios write to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='mixed')
+        parser.add_argument('--prefix', default='bench', help="The --prefix the data was seeded with.")
+        parser.add_argument('--iterations', type=int, default=200, help="Scenario rounds per thread.")
+        parser.add_argument('--concurrency', type=int, default=1, help="Number of client threads.")
+        parser.add_argument('--warmup', type=int, default=10, help="Unrecorded rounds run first.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(email__startswith=f"{options['prefix']}-user-").order_by('id'))
+        if not users:
+            raise CommandError(f"No seeded users with prefix '{options['prefix']}'. Run seed_data first.")
+
+        product_ids = list(Product.objects.filter(stock__gt=0).values_list('id', flat=True))
+        catalog = {
+            'product_ids': product_ids,
+            'category_names': list(Category.objects.values_list('name', flat=True)),
+            'pages': max(1, math.ceil(len(product_ids) / settings.REST_FRAMEWORK['PAGE_SIZE'])),
+        }
+        scenario = SCENARIOS[options['scenario']]
+        seed = options['seed']
+
+        # The test client talks to 'testserver', and every simulated user
+        # shares its address, so the per-IP throttles are turned off.
+        no_throttles = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], REST_FRAMEWORK=no_throttles):
+            if options['warmup']:
+                run(scenario, users, catalog, options['warmup'], 1, lambda i: random.Random(seed - 1))
+            report = run(
+                scenario, users, catalog, options['iterations'], options['concurrency'],
+                lambda i: random.Random(seed * 1000 + i),
+            )
+
+        report['meta'] = {
+            'scenario': scenario.name,
+            'iterations': options['iterations'],
+            'concurrency': options['concurrency'],
+            'seed': seed,
+            'finished_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            total = report['total']
+            self.stdout.write(self.style.SUCCESS(
+                f"{total['requests']} requests, {total['throughput_rps']} req/s, "
+                f"p95 {total['latency_ms']['p95']} ms. Report written to {options['output']}."
+            ))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,61 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from benchmarks import seed
+from products.listings import refresh_listings
+from reports.rollups import rebuild_daily_sales
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = "Generates synthetic categories, products, users, carts and orders with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench',
+                            help="Prefix for seeded names and emails, so runs can coexist.")
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--stock', type=int, default=1000000,
+                            help="Initial stock per product. Keep it high for checkout benchmarks.")
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--carts', type=int, default=100, help="How many users get a pre-filled cart.")
+        parser.add_argument('--cart-lines', type=int, default=5)
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--days', type=int, default=365, help="Spread order dates over this many past days.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible datasets.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(email__startswith=f"{prefix}-user-").exists():
+            raise CommandError(f"Data with prefix '{prefix}' already exists. Use a different --prefix.")
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            products = seed.seed_catalog(
+                prefix, options['categories'], options['products'], options['stock'], batch_size, rng
+            )
+            user_ids = seed.seed_users(prefix, options['users'], batch_size)
+            seed.seed_carts(user_ids, products, options['carts'], options['cart_lines'], batch_size, rng)
+            seed.seed_orders(
+                user_ids, products, options['orders'], options['items_per_order'], options['days'], batch_size, rng
+            )
+            # Bulk inserts skip the signals and outbox tasks that maintain the read models.
+            refresh_listings([product_id for product_id, _ in products], batch_size=batch_size)
+            today = timezone.localdate()
+            rebuild_daily_sales(today - datetime.timedelta(days=options['days']), today, batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['categories']} categories, {len(products)} products, {len(user_ids)} users, "
+            f"{options['carts']} carts and {options['orders']} orders in {time.perf_counter() - started:.1f}s. "
+            f"Users log in as {seed.seed_email(prefix, 0)} / {seed.SEED_PASSWORD}."
+        ))
@@ -0,0 +1,65 @@
+import json
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from benchmarks.contention import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Fires many concurrent checkouts and cancels at a few hot products, reports orders/s, "
+        "lock wait time and deadlocks, and fails if stock went negative or was not conserved. "
+        "Meant for a local PostgreSQL database; it creates its own products and buyers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=3, help="Number of hot products.")
+        parser.add_argument('--stock', type=int, default=200, help="Initial stock of each hot product.")
+        parser.add_argument('--buyers', type=int, default=20, help="Concurrent buyer threads.")
+        parser.add_argument('--iterations', type=int, default=25, help="Checkout attempts per buyer.")
+        parser.add_argument('--max-quantity', type=int, default=3)
+        parser.add_argument('--cancel-rate', type=float, default=0.2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--allow-any-database', action='store_true',
+                            help="Run on databases other than PostgreSQL (results are not meaningful).")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' and not options['allow_any_database']:
+            raise CommandError("The checkout stress test needs PostgreSQL row locking.")
+
+        run_id = timezone.now().strftime('%Y%m%d%H%M%S%f')
+        seed = options['seed']
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            report = run(
+                run_id,
+                products=options['products'],
+                stock=options['stock'],
+                buyers=options['buyers'],
+                iterations=options['iterations'],
+                max_quantity=options['max_quantity'],
+                cancel_rate=options['cancel_rate'],
+                rng_factory=lambda i: random.Random(seed * 1000 + i),
+            )
+        report['meta'] = {'run_id': run_id, 'database': connection.vendor, **{
+            key: options[key] for key in ('products', 'stock', 'buyers', 'iterations', 'max_quantity', 'cancel_rate', 'seed')
+        }}
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+        if not report['invariants_hold']:
+            raise CommandError("Stock invariants violated; see the 'invariants' section of the report.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['orders_placed']} orders, {report['orders_per_second']} orders/s, "
+            f"{report['deadlocks']} deadlocks, invariants hold."
+        ))
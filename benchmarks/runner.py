@@ -0,0 +1,145 @@
+"""
+In-process benchmark runner.
+
+Drives the real URL routes through Django's test client, so every request
+goes through the full middleware, authentication, view and serializer stack,
+just without a network hop. Each request's latency, status and number of
+SQL queries is recorded, and the results are summarised per route.
+"""
+import json
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class QueryCounter:
+    """
+    ``connection.execute_wrapper`` hook that counts queries.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed_seconds):
+    latencies = sorted(ms for ms, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed_seconds, 2) if elapsed_seconds else None,
+        'server_errors': sum(1 for _, _, status in samples if status >= 500),
+        'client_errors': sum(1 for _, _, status in samples if 400 <= status < 500),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 3) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 3) if latencies else None,
+            'max': round(latencies[-1], 3) if latencies else None,
+        },
+        'queries_per_request': {
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed_ms, queries, status_code):
+        with self._lock:
+            self._samples.setdefault(name, []).append((elapsed_ms, queries, status_code))
+
+    def report(self, elapsed_seconds):
+        everything = [sample for samples in self._samples.values() for sample in samples]
+        return {
+            'total': summarize(everything, elapsed_seconds),
+            'routes': {
+                name: summarize(samples, elapsed_seconds)
+                for name, samples in sorted(self._samples.items())
+            },
+        }
+
+
+class Session:
+    """
+    One simulated client: a test client authenticated as a single user.
+    """
+
+    def __init__(self, user, recorder, raise_request_exception=True):
+        self.user = user
+        self.recorder = recorder
+        # With raise_request_exception=False, server errors come back as 500 responses.
+        self.client = Client(raise_request_exception=raise_request_exception)
+        self.auth_header = f"Bearer {AccessToken.for_user(user)}"
+
+    def request(self, method, route, url_kwargs=None, data=None, query_params=None):
+        url = reverse(route, kwargs=url_kwargs)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            started = time.perf_counter()
+            if method == 'GET':
+                response = self.client.get(url, query_params, HTTP_AUTHORIZATION=self.auth_header)
+            else:
+                response = self.client.generic(
+                    method, url, json.dumps(data or {}),
+                    content_type='application/json', HTTP_AUTHORIZATION=self.auth_header,
+                )
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.recorder.record(f"{method} {route}", elapsed_ms, counter.count, response.status_code)
+        return response
+
+
+def run(scenario, users, catalog, iterations, concurrency, rng_factory):
+    """
+    Runs ``iterations`` scenario rounds on each of ``concurrency`` threads and
+    returns the report. Each thread plays a different user.
+    """
+    recorder = Recorder()
+    errors = []
+
+    def worker(index):
+        rng = rng_factory(index)
+        session = Session(users[index % len(users)], recorder)
+        try:
+            for _ in range(iterations):
+                scenario.run_once(session, catalog, rng)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if errors:
+        raise errors[0]
+    report = recorder.report(elapsed)
+    report['elapsed_seconds'] = round(elapsed, 3)
+    return report
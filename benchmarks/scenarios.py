@@ -0,0 +1,54 @@
+"""
+Traffic scenarios for the benchmark runner.
+
+A scenario is a weighted mix of user journeys. Each journey is a function
+``journey(session, catalog, rng)`` that issues a few requests the way a real
+client would, e.g. browse a page of products and open one of them.
+"""
+
+
+def browse(session, catalog, rng):
+    query = {'page': rng.randint(1, catalog['pages'])}
+    if rng.random() < 0.3:
+        query = {'category': rng.choice(catalog['category_names']), 'in_stock': 'true'}
+    session.request('GET', 'public-product-list', query_params=query)
+    for _ in range(2):
+        session.request('GET', 'public-product-detail', url_kwargs={'pk': rng.choice(catalog['product_ids'])})
+
+
+def shop(session, catalog, rng):
+    session.request('POST', 'cart-list', data={'product_id': rng.choice(catalog['product_ids']), 'quantity': 1})
+    items = session.request('GET', 'cart-list').json().get('items', [])
+    if items and rng.random() < 0.5:
+        session.request('PATCH', 'cart-detail', url_kwargs={'pk': items[0]['id']}, data={'quantity': 2})
+    # Keep carts from growing without bound over a long run.
+    if len(items) > 10 or (items and rng.random() < 0.3):
+        session.request('DELETE', 'cart-detail', url_kwargs={'pk': rng.choice(items)['id']})
+
+
+def checkout(session, catalog, rng):
+    for product_id in rng.sample(catalog['product_ids'], rng.randint(1, 3)):
+        session.request('POST', 'cart-list', data={'product_id': product_id, 'quantity': 1})
+    response = session.request('POST', 'order-create')
+    if response.status_code == 201 and rng.random() < 0.2:
+        session.request('POST', 'order-cancel', url_kwargs={'pk': response.json()['id']})
+    session.request('GET', 'order-list')
+
+
+class Scenario:
+    def __init__(self, name, journeys):
+        self.name = name
+        self.journeys = [journey for journey, _ in journeys]
+        self.weights = [weight for _, weight in journeys]
+
+    def run_once(self, session, catalog, rng):
+        journey = rng.choices(self.journeys, weights=self.weights)[0]
+        journey(session, catalog, rng)
+
+
+SCENARIOS = {
+    'browse': Scenario('browse', [(browse, 1)]),
+    'cart': Scenario('cart', [(shop, 1)]),
+    'checkout': Scenario('checkout', [(checkout, 1)]),
+    'mixed': Scenario('mixed', [(browse, 70), (shop, 20), (checkout, 10)]),
+}
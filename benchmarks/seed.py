@@ -0,0 +1,105 @@
+"""
+Synthetic data generation for benchmarks and load tests.
+
+Everything is written with bulk inserts, so seeding hundreds of thousands of
+rows takes seconds rather than minutes. All seeded users share one password
+(``SEED_PASSWORD``) and an email address starting with the run's prefix.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from carts.models import Cart, CartItem, Order, OrderItem
+from products.models import Category, Product
+from users.models import User
+
+SEED_PASSWORD = 'BenchmarkPassword123'
+
+
+def seed_email(prefix, n):
+    return f"{prefix}-user-{n}@example.com"
+
+
+def seed_catalog(prefix, categories, products, stock, batch_size, rng):
+    Category.objects.bulk_create(
+        [Category(name=f"{prefix} category {i}", description=f"Seeded category {i}") for i in range(categories)],
+        batch_size=batch_size,
+    )
+    category_ids = list(Category.objects.filter(name__startswith=f"{prefix} category ").values_list('id', flat=True))
+    Product.objects.bulk_create(
+        [
+            Product(
+                name=f"{prefix} product {i}",
+                description=f"Seeded product {i}. " * rng.randint(5, 40),
+                price=Decimal(rng.randint(100, 100000)) / 100,
+                stock=stock,
+                category_id=category_ids[i % len(category_ids)],
+            )
+            for i in range(products)
+        ],
+        batch_size=batch_size,
+    )
+    return list(Product.objects.filter(name__startswith=f"{prefix} product ").values_list('id', 'price'))
+
+
+def seed_users(prefix, users, batch_size):
+    # Hashing once and sharing the hash keeps user creation fast.
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(email=seed_email(prefix, i), password=password, name=f"Seeded user {i}", phone='1234567890')
+            for i in range(users)
+        ],
+        batch_size=batch_size,
+    )
+    return list(User.objects.filter(email__startswith=f"{prefix}-user-").values_list('id', flat=True))
+
+
+def seed_carts(user_ids, products, carts, lines, batch_size, rng):
+    Cart.objects.bulk_create([Cart(user_id=user_id) for user_id in user_ids[:carts]], batch_size=batch_size)
+    cart_ids = Cart.objects.filter(user_id__in=user_ids[:carts]).values_list('id', flat=True)
+    CartItem.objects.bulk_create(
+        [
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=rng.randint(1, 3))
+            for cart_id in cart_ids
+            for product_id, _ in rng.sample(products, min(lines, len(products)))
+        ],
+        batch_size=batch_size,
+    )
+
+
+def seed_orders(user_ids, products, orders, items_per_order, days, batch_size, rng):
+    """
+    Creates orders spread over the last ``days`` days with a realistic status mix.
+    """
+    statuses = [Order.OrderStatus.DELIVERED] * 6 + [Order.OrderStatus.SHIPPED] * 2 + [
+        Order.OrderStatus.PENDING, Order.OrderStatus.CANCELLED
+    ]
+    now = timezone.now()
+    lines_per_order = [rng.sample(products, min(items_per_order, len(products))) for _ in range(orders)]
+    created = Order.objects.bulk_create(
+        [
+            Order(
+                user_id=rng.choice(user_ids),
+                status=rng.choice(statuses),
+                total_price=sum(price for _, price in lines),
+            )
+            for lines in lines_per_order
+        ],
+        batch_size=batch_size,
+    )
+    # auto_now_add ignores values passed to bulk_create, so back-date with bulk_update.
+    for order in created:
+        order.created_at = now - timedelta(seconds=rng.randint(0, days * 24 * 60 * 60))
+        order.updated_at = order.created_at
+    Order.objects.bulk_update(created, ['created_at', 'updated_at'], batch_size=batch_size)
+    OrderItem.objects.bulk_create(
+        [
+            OrderItem(order=order, product_id=product_id, quantity=1, price=price)
+            for order, lines in zip(created, lines_per_order)
+            for product_id, price in lines
+        ],
+        batch_size=batch_size,
+    )
@@ -0,0 +1,154 @@
+"""
+Worker startup profiling.
+
+Each measurement boots Django in a fresh interpreter, the way a newly forked
+gunicorn/uvicorn worker without ``--preload`` would, and goes as far as a
+worker does before serving its first request: load the settings, populate
+the app registry, build the request handler (middleware) and import the
+URLconf (and with it every view and serializer). The child process reports
+how long each phase took, how many modules it imported and its current and
+peak resident memory (RSS). With ``-X importtime``, CPython also reports the
+import time of every module.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .runner import percentile
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+phases = {}
+
+def mark(phase):
+    global started
+    now = time.perf_counter()
+    phases[phase] = round((now - started) * 1000, 3)
+    started = now
+
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+mark('settings_ms')
+django.setup(set_prefix=False)
+mark('apps_ready_ms')
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+mark('handler_ms')
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark('urls_ms')
+
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+peak_rss_kb = peak_rss // 1024 if sys.platform == 'darwin' else peak_rss
+try:
+    with open('/proc/self/statm') as statm:
+        rss_kb = int(statm.read().split()[1]) * resource.getpagesize() // 1024
+except OSError:
+    rss_kb = peak_rss_kb
+print(json.dumps({
+    'phases': phases,
+    'modules': len(sys.modules),
+    'rss_kb': rss_kb,
+    'peak_rss_kb': peak_rss_kb,
+}))
+"""
+
+
+def probe(profile, importtime=False):
+    """
+    Boots Django once under the given settings profile. Returns the child's
+    report, with the wall-clock time of the whole process added as
+    ``cold_start_ms``, and the raw ``-X importtime`` output.
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE]
+    env = {**os.environ, 'SETTINGS_PROFILE': profile}
+
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=False)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup probe for profile '{profile}' failed:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['cold_start_ms'] = round(elapsed_ms, 3)
+    return report, result.stderr
+
+
+def parse_importtime(output):
+    """
+    Parses ``-X importtime`` output into (module, self µs, cumulative µs) tuples.
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line.
+        modules.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return modules
+
+
+def profile_imports(profile, top):
+    """
+    Reports the startup phases of one boot and the slowest imports, by module
+    (cumulative, i.e. including what the module imports) and by top-level package.
+    """
+    report, output = probe(profile, importtime=True)
+    modules = parse_importtime(output)
+    packages = defaultdict(int)
+    for module, self_us, _ in modules:
+        packages[module.split('.')[0]] += self_us
+
+    report['import_ms'] = round(sum(self_us for _, self_us, _ in modules) / 1000, 3)
+    report['slowest_modules'] = [
+        {'module': module, 'self_ms': round(self_us / 1000, 3), 'cumulative_ms': round(cumulative_us / 1000, 3)}
+        for module, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:top]
+    ]
+    report['slowest_packages'] = [
+        {'package': package, 'self_ms': round(self_us / 1000, 3)}
+        for package, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]
+    ]
+    return report
+
+
+def _summary(values, digits=3):
+    values = sorted(values)
+    return {
+        'mean': round(sum(values) / len(values), digits),
+        'p50': round(percentile(values, 0.50), digits),
+        'max': round(values[-1], digits),
+    }
+
+
+def benchmark(profiles, runs):
+    """
+    Boots Django ``runs`` times per settings profile and summarises cold-start
+    time, the time of each phase, imported modules and RSS per worker.
+    """
+    results = {}
+    for profile in profiles:
+        reports = [probe(profile)[0] for _ in range(runs)]
+        results[profile] = {
+            'runs': runs,
+            'cold_start_ms': _summary([report['cold_start_ms'] for report in reports]),
+            'phases_ms': {
+                phase: _summary([report['phases'][phase] for report in reports])
+                for phase in reports[0]['phases']
+            },
+            'modules': reports[-1]['modules'],
+            'rss_kb': _summary([report['rss_kb'] for report in reports], digits=0),
+            'peak_rss_kb': _summary([report['peak_rss_kb'] for report in reports], digits=0),
+        }
+    return results
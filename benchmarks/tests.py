@@ -0,0 +1,89 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from carts.models import Order
+from products import snapshots
+from products.models import Product
+from users.models import User
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkCommandTests(TransactionTestCase):
+    # The runner's client threads use their own connections, so the seed data must be committed.
+
+    def setUp(self):
+        # Product snapshots cached by other tests would outlive the flushed tables.
+        cache.clear()
+        snapshots.local_cache.clear()
+
+    def seed(self):
+        call_command(
+            'seed_data', products=40, categories=4, users=5, carts=2, orders=30, stdout=StringIO()
+        )
+
+    def test_seed_data(self):
+        self.seed()
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(User.objects.filter(email__startswith='bench-user-').count(), 5)
+        self.assertEqual(Order.objects.count(), 30)
+
+    def test_run_benchmark_reports_every_route(self):
+        self.seed()
+        out = StringIO()
+        call_command('run_benchmark', scenario='mixed', iterations=20, warmup=0, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report['total']['server_errors'], 0)
+        self.assertEqual(report['total']['client_errors'], 0)
+        self.assertIn('GET public-product-list', report['routes'])
+        for stats in report['routes'].values():
+            self.assertIsNotNone(stats['latency_ms']['p99'])
+
+    def test_benchmark_throttle(self):
+        out = StringIO()
+        call_command('benchmark_throttle', checks=200, clients=10, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertLessEqual(report['cache_counter']['cache_calls_per_check'], 1.1)
+        self.assertEqual(report['rejected_catalog_request']['statuses'], [429])
+        self.assertEqual(report['rejected_catalog_request']['queries_per_request'], 0)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StressCheckoutCommandTests(TransactionTestCase):
+    # Buyers run on their own threads and connections, so the data must be committed.
+
+    def test_stock_invariants_hold(self):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'stress_checkout', products=2, stock=15, buyers=1, iterations=20,
+                allow_any_database=True, output=output.name, stdout=StringIO(),
+            )
+            report = json.load(output)
+        self.assertTrue(report['invariants_hold'])
+        self.assertGreater(report['orders_placed'], 0)
+        self.assertEqual(report['total']['server_errors'], 0)
+
+
+class StartupCommandTests(SimpleTestCase):
+    # Both commands boot Django in child processes; nothing touches the test database.
+
+    def test_benchmark_startup(self):
+        out = StringIO()
+        call_command('benchmark_startup', runs=1, stdout=out)
+        report = json.loads(out.getvalue())
+        for profile in ('full', 'api'):
+            self.assertGreater(report[profile]['rss_kb']['max'], 0)
+            self.assertIn('apps_ready_ms', report[profile]['phases_ms'])
+        # The api profile leaves out the admin, sessions, messages and templates.
+        self.assertLess(report['api']['modules'], report['full']['modules'])
+
+    def test_profile_startup(self):
+        out = StringIO()
+        call_command('profile_startup', profile='api', top=5, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(len(report['slowest_modules']), 5)
+        self.assertGreater(report['import_ms'], 0)
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark for the cost of a throttle check.
+
+Times ``allow_request`` for the cache-counter throttle used by the API and,
+for comparison, DRF's stock ``SimpleRateThrottle`` (a list of timestamps per
+client), against the configured default cache. Each check is measured in
+calls to the Django cache API and, on Redis, in network round trips (one
+pipeline is one round trip). Also drives a throttled
+route through the test client to show what a rejected request costs.
+Counters are written under scopes and an IP address reserved for the
+benchmark, so it can run against a shared cache without clearing it.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import SimpleRateThrottle
+
+from ecom_project.throttling import CacheCounterThrottle
+from .runner import QueryCounter, percentile
+
+
+CACHE_METHODS = ('get', 'set', 'add', 'incr', 'delete', 'get_many', 'set_many')
+
+
+class CallCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def wrap(self, func):
+        def call(*args, **kwargs):
+            self.calls += 1
+            return func(*args, **kwargs)
+        return call
+
+
+@contextmanager
+def counting(target, names, counter):
+    """
+    Temporarily replaces the named methods of ``target`` with counting wrappers.
+    """
+    originals = {name: target.__dict__.get(name) for name in names}
+    for name in names:
+        setattr(target, name, counter.wrap(getattr(target, name)))
+    try:
+        yield counter
+    finally:
+        for name, original in originals.items():
+            if original is None:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
+
+
+# A TEST-NET address (RFC 5737), so the benchmark never exhausts a real client's allowance.
+BENCHMARK_CLIENT_IP = '192.0.2.1'
+
+
+class TimestampListThrottle(SimpleRateThrottle):
+    # DRF's stock algorithm, keyed the same way as the cache-counter throttle.
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+def time_checks(throttle_class, scope, requests, checks, rate):
+    measured = type(throttle_class.__name__, (throttle_class,), {'scope': scope, 'rate': rate})
+    backend = caches['default']
+    cache_calls = CallCounter()
+    round_trips = CallCounter()
+    timings = []
+    with ExitStack() as stack:
+        stack.enter_context(counting(backend, CACHE_METHODS, cache_calls))
+        if isinstance(backend, RedisCache):
+            from redis.connection import Connection
+            # Every command, or pipeline of commands, is written to the socket in one call.
+            stack.enter_context(counting(Connection, ['send_packed_command'], round_trips))
+        for i in range(checks):
+            request = requests[i % len(requests)]
+            started = time.perf_counter()
+            measured().allow_request(request, None)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    return {
+        'checks': checks,
+        'cache_calls_per_check': round(cache_calls.calls / checks, 3),
+        # Only measured on Redis; other backends report None.
+        'round_trips_per_check': round(round_trips.calls / checks, 3) if isinstance(backend, RedisCache) else None,
+        'latency_us': {
+            'mean': round(sum(timings) / len(timings), 2),
+            'p50': round(percentile(timings, 0.50), 2),
+            'p99': round(percentile(timings, 0.99), 2),
+        },
+    }
+
+
+def time_rejected_requests(route, scope, count):
+    """
+    Exhausts ``scope`` for one client and times ``count`` rejected requests to ``route``.
+    """
+    client = Client(REMOTE_ADDR=BENCHMARK_CLIENT_IP)
+    url = reverse(route)
+    rates = {**settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}), scope: '1/hour'}
+    timings = []
+    queries = 0
+    statuses = set()
+    with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+        client.get(url)
+        for _ in range(count):
+            counter = QueryCounter()
+            with connections['default'].execute_wrapper(counter):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries += counter.count
+            statuses.add(response.status_code)
+    timings.sort()
+    return {
+        'requests': count,
+        'statuses': sorted(statuses),
+        'queries_per_request': round(queries / count, 3),
+        'latency_ms': {
+            'p50': round(percentile(timings, 0.50), 3),
+            'p99': round(percentile(timings, 0.99), 3),
+        },
+    }
+
+
+def run(run_id, checks, clients):
+    factory = APIRequestFactory()
+    requests = [
+        Request(factory.get('/', REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}'))
+        for i in range(clients)
+    ]
+    # A rate high enough that every check is allowed, which is the common (and,
+    # for the timestamp list, the most expensive) case.
+    rate = f'{checks}/hour'
+    return {
+        'cache_counter': time_checks(CacheCounterThrottle, f'benchmark-{run_id}-counter', requests, checks, rate),
+        'timestamp_list': time_checks(TimestampListThrottle, f'benchmark-{run_id}-timestamps', requests, checks, rate),
+        'rejected_catalog_request': time_rejected_requests('public-product-list', 'catalog', min(checks, 200)),
+    }
@@ -1,3 +1,66 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from ecom_project.admin_tools import LargeTableAdmin
+from .models import Cart, CartItem, Order, OrderItem
+from .orders import cancel_order
+
+
+class ReadOnlyInline(admin.TabularInline):
+    """
+    Lines are shown read-only: they are customer records, and rendering them
+    from the joined queryset avoids a raw-id widget lookup per row.
+    """
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class CartItemInline(ReadOnlyInline):
+    model = CartItem
+    fields = readonly_fields = ('product', 'quantity')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'cart__user')
+
+
+@admin.register(Cart)
+class CartAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    inlines = [CartItemInline]
+    ordering = ('-id',)
+
+
+class OrderItemInline(ReadOnlyInline):
+    model = OrderItem
+    fields = readonly_fields = ('product', 'quantity', 'price')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'status', 'total_price', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('status',)
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+    # Status changes have side effects (restock, outbox tasks), so they go
+    # through the cancel action rather than the form.
+    readonly_fields = ('status', 'created_at', 'updated_at')
+    inlines = [OrderItemInline]
+    ordering = ('-id',)
+    actions = ['cancel_orders']
+
+    @admin.action(description="Cancel selected pending orders")
+    def cancel_orders(self, request, queryset):
+        cancelled = sum(cancel_order(order) for order in queryset.filter(status=Order.OrderStatus.PENDING))
+        self.message_user(request, f"Cancelled {cancelled} order(s).", messages.SUCCESS)
@@ -0,0 +1,58 @@
+"""
+Archival of old order history.
+
+Delivered and cancelled orders older than a cutoff are copied into the
+``ArchivedOrder``/``ArchivedOrderItem`` cold tables and deleted from the hot
+``Order``/``OrderItem`` tables, one batch per transaction. Orders that are
+still pending or shipped are never archived.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVABLE_STATUSES = (Order.OrderStatus.DELIVERED, Order.OrderStatus.CANCELLED)
+
+ORDER_FIELDS = ['id', 'user_id', 'total_price', 'status', 'created_at', 'updated_at']
+ITEM_FIELDS = ['id', 'order_id', 'product_id', 'quantity', 'price']
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_orders(cutoff, batch_size=1000):
+    """
+    Moves finished orders created before ``cutoff`` to the archive tables.
+    Returns the number of orders archived.
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            # SKIP LOCKED leaves orders that are being changed right now for the next run.
+            orders = list(
+                archivable_orders(cutoff).select_for_update(skip_locked=True)
+                .order_by('id').values(*ORDER_FIELDS)[:batch_size]
+            )
+            if not orders:
+                return archived
+            order_ids = [order['id'] for order in orders]
+            items = list(OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_FIELDS))
+
+            now = timezone.now()
+            ArchivedOrder.objects.bulk_create(
+                [ArchivedOrder(archived_at=now, **order) for order in orders], batch_size=batch_size
+            )
+            ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items], batch_size=batch_size)
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(id__in=order_ids).delete()
+        archived += len(orders)
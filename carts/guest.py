@@ -0,0 +1,124 @@
+"""
+Guest carts: carts for anonymous users, kept in the cache instead of the database.
+
+A guest cart is identified by an opaque token that the API returns in the
+``X-Cart-Token`` response header (and as the cart ``id``); the client sends it
+back in the same request header. The cart is stored as a tuple of
+``(product_id, quantity)`` pairs, so adding, changing and removing items never
+writes to the database. When the guest logs in with the token header, the
+cart is merged into their database cart (see ``merge_guest_cart``).
+"""
+import json
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Cart, CartItem
+from .reservations import held_quantities, reserve_many
+from .serializers import EMPTY_CART_MESSAGE
+from products.models import Product, ProductListing
+
+GUEST_CART_HEADER = 'X-Cart-Token'
+
+
+def _cache_key(token):
+    return f'guest-cart:{token}'
+
+
+class GuestCart:
+    """
+    An anonymous user's cart: an ordered mapping of product id to quantity.
+    Line ids in the API are the product ids.
+    """
+
+    def __init__(self, token=None, lines=None):
+        self.token = token
+        self.lines = lines or {}
+
+    @classmethod
+    def load(cls, token):
+        """
+        Returns the cart stored under the token, or an empty, unsaved cart.
+        """
+        stored = cache.get(_cache_key(token)) if token else None
+        if stored is None:
+            return cls()
+        return cls(token, dict(stored))
+
+    def save(self):
+        if self.token is None:
+            self.token = secrets.token_urlsafe(16)
+        cache.set(_cache_key(self.token), tuple(self.lines.items()), settings.GUEST_CART_SECONDS)
+
+    def delete(self):
+        if self.token is not None:
+            cache.delete(_cache_key(self.token))
+
+    def to_representation(self):
+        """
+        Renders the cart in the same shape as CartSerializer. The products come
+        from the catalog read model, already rendered, in one primary-key lookup.
+        """
+        listings = {}
+        if self.lines:
+            rows = ProductListing.objects.filter(product_id__in=list(self.lines)).values_list('product_id', 'price', 'data')
+            listings = {product_id: (price, data) for product_id, price, data in rows}
+        items = [
+            {
+                'id': product_id,
+                'product': json.loads(listings[product_id][1]),
+                'quantity': quantity,
+                'total_price': listings[product_id][0] * quantity,
+            }
+            for product_id, quantity in self.lines.items()
+            # Products deleted since they were added simply drop out.
+            if product_id in listings
+        ]
+        return {
+            'id': self.token,
+            'user': None,
+            'items': items,
+            'grand_total': sum(item['total_price'] for item in items),
+            'created_at': None,
+            'message': f"You have {len(items)} item(s) in your cart." if items else EMPTY_CART_MESSAGE,
+        }
+
+
+def merge_guest_cart(token, user):
+    """
+    Moves a guest cart into the user's database cart with one bulk upsert of
+    the cart lines, adding quantities for products already in it and capping
+    each line at the stock that is still available. Returns the number of lines merged.
+    """
+    guest_cart = GuestCart.load(token)
+    if not guest_cart.lines:
+        return 0
+
+    with transaction.atomic():
+        cart, _ = Cart.objects.get_or_create(user=user)
+        # Lock the products in a stable order, as checkout does.
+        products = {
+            product.id: product
+            for product in Product.objects.select_for_update().filter(id__in=list(guest_cart.lines)).order_by('id')
+        }
+        existing = dict(
+            CartItem.objects.filter(cart=cart, product_id__in=products).values_list('product_id', 'quantity')
+        )
+        held_by_others = held_quantities(list(products), exclude_cart=cart)
+
+        merged = []
+        for product_id, product in products.items():
+            available = product.stock - held_by_others.get(product_id, 0)
+            quantity = min(existing.get(product_id, 0) + guest_cart.lines[product_id], available)
+            if quantity > 0:
+                merged.append(CartItem(cart=cart, product=product, quantity=quantity))
+
+        CartItem.objects.bulk_create(
+            merged, update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity']
+        )
+        reserve_many(CartItem.objects.filter(cart=cart, product_id__in=[item.product_id for item in merged]))
+
+    guest_cart.delete()
+    return len(merged)
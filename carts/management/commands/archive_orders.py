@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from carts.archive import archivable_orders, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = ("Moves delivered and cancelled orders older than the cutoff to the archive tables in batches. "
+            "Run it periodically (e.g. nightly from cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Archive orders older than this many days. Defaults to ORDER_ARCHIVE_AFTER_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many orders would be archived.")
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] is not None and options['older_than_days'] < 0:
+            raise CommandError("--older-than-days must not be negative.")
+
+        cutoff = archive_cutoff(options['older_than_days'])
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} order(s) created before {cutoff:%Y-%m-%d %H:%M} would be archived.")
+            return
+
+        archived = archive_orders(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} order(s) created before {cutoff:%Y-%m-%d %H:%M}."))
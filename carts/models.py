@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from products.models import Product
 
 class Cart(models.Model):
@@ -25,6 +26,33 @@ class CartItem(models.Model):
     def total_price(self):
         return self.product.price * self.quantity
 
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+# A time-limited hold on product stock for one cart line.
+# Available stock is the product's stock minus the sum of its active holds.
+class StockReservation(models.Model):
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name='reservation')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Serves the per-product SUM(quantity) WHERE expires_at > now() aggregate.
+            models.Index(fields=['product', 'expires_at'], name='carts_reservation_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} of product {self.product_id} held until {self.expires_at}"
+
 # Order and OrderItem models for handling orders in the e-commerce application.
 class Order(models.Model):
     class OrderStatus(models.TextChoices):
@@ -41,6 +69,12 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Sales rollups read one day of orders at a time.
+            models.Index(fields=['created_at'], name='carts_order_created_idx'),
+            # A user's order history, newest first.
+            models.Index(fields=['user', '-created_at'], name='carts_order_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} by {self.user.email}"
@@ -53,4 +87,39 @@ class OrderItem(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
-        return f"{self.quantity} of {self.product.name} in Order {self.order.id}"
\ No newline at end of file
+        return f"{self.quantity} of {self.product.name} in Order {self.order_id}"
+
+
+# Cold storage for old, finished orders. carts/archive.py moves delivered and
+# cancelled orders here once they are older than ORDER_ARCHIVE_AFTER_DAYS, so the
+# hot Order/OrderItem tables and their indexes only hold recent history.
+# Rows keep their original ids.
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=1, choices=Order.OrderStatus.choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='carts_archived_user_idx'),
+            models.Index(fields=['created_at'], name='carts_archived_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id} by {self.user.email}"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity} of {self.product.name} in archived order {self.order_id}"
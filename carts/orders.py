@@ -0,0 +1,57 @@
+"""
+Order state changes that have side effects beyond the order row.
+
+Both the API and the Django admin cancel orders through ``cancel_order``, so
+stock, the catalog, product snapshots and the sales rollups stay in step
+whichever way an order is cancelled.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from outbox.queue import enqueue
+from products.models import Product
+from products.snapshots import invalidate_snapshots
+from .models import Order
+
+
+def cancel_order(order):
+    """
+    Cancels a pending order and puts its stock back. Returns False, and
+    changes nothing, if the order is no longer pending.
+    """
+    with transaction.atomic():
+        # Only a still-pending order is flipped, so a concurrent cancel
+        # turns this into a no-op instead of a double restock.
+        cancelled = Order.objects.filter(id=order.id, status=Order.OrderStatus.PENDING).update(
+            status=Order.OrderStatus.CANCELLED,
+            updated_at=timezone.now()
+        )
+        if not cancelled:
+            return False
+
+        quantities = dict(
+            order.items.values('product_id')
+            .annotate(quantity=Sum('quantity'))
+            .values_list('product_id', 'quantity')
+        )
+        # Lock in id order, the same order checkout uses, so the two cannot deadlock.
+        list(
+            Product.objects.select_for_update()
+            .filter(id__in=quantities).order_by('id').values_list('id', flat=True)
+        )
+        # Restock every product in a single UPDATE ... SET stock = stock + CASE ... END.
+        Product.objects.filter(id__in=quantities).update(
+            stock=F('stock') + Case(
+                *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+                default=Value(0)
+            ),
+            updated_at=timezone.now()
+        )
+        enqueue('order.cancelled', order_id=order.id)
+        enqueue('sales.rollup', order_id=order.id, day=timezone.localdate(order.created_at).isoformat(), sign=-1)
+        enqueue('catalog.refresh', product_ids=list(quantities))
+        invalidate_snapshots(quantities)
+
+    order.status = Order.OrderStatus.CANCELLED
+    return True
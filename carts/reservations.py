@@ -0,0 +1,72 @@
+"""
+Stock reservations: short-lived holds placed on product stock when items go
+into a cart, so that checkout only has to re-verify and decrement.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def held_quantities(product_ids, exclude_cart=None):
+    """
+    Returns {product_id: quantity} of active holds on the given products,
+    optionally ignoring the holds that belong to one cart.
+    """
+    reservations = StockReservation.objects.active().filter(product_id__in=product_ids)
+    if exclude_cart is not None:
+        reservations = reservations.exclude(cart_item__cart=exclude_cart)
+    rows = reservations.values('product_id').annotate(held=Sum('quantity'))
+    return {row['product_id']: row['held'] for row in rows}
+
+
+def available_stock(product, exclude_cart=None):
+    """
+    Stock that is free to be added to a cart: stock minus other carts' active holds.
+    """
+    held = held_quantities([product.id], exclude_cart=exclude_cart).get(product.id, 0)
+    return product.stock - held
+
+
+def reserve(cart_item):
+    """
+    Places or refreshes the hold for a cart line at its current quantity.
+    """
+    reserve_many([cart_item])
+
+
+def reserve_many(cart_items):
+    """
+    Places or refreshes the holds for several cart lines with one upsert.
+    """
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_SECONDS)
+    StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                cart_item=cart_item,
+                product_id=cart_item.product_id,
+                quantity=cart_item.quantity,
+                expires_at=expires_at,
+            )
+            for cart_item in cart_items
+        ],
+        update_conflicts=True,
+        unique_fields=['cart_item'],
+        update_fields=['quantity', 'expires_at'],
+    )
+
+
+def release_expired(batch_size=1000):
+    """
+    Deletes expired holds in batches and returns how many were removed.
+    Expired holds are already ignored by availability checks; this only keeps the table small.
+    """
+    released = 0
+    while True:
+        ids = list(StockReservation.objects.expired().values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return released
+        released += StockReservation.objects.filter(id__in=ids).delete()[0]
@@ -1,7 +1,9 @@
 from rest_framework import serializers
-from .models import Cart, CartItem, Order, OrderItem
+from .models import ArchivedOrder, ArchivedOrderItem, Cart, CartItem, Order, OrderItem
 from products.serializers import ProductSerializer
 
+EMPTY_CART_MESSAGE = "Your shopping cart is currently empty."
+
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     total_price = serializers.ReadOnlyField()
@@ -32,7 +34,7 @@ class CartSerializer(serializers.ModelSerializer):
     
     def get_message(self, obj):
         if obj.items.count() == 0:
-            return "Your shopping cart is currently empty."
+            return EMPTY_CART_MESSAGE
         return f"You have {obj.items.count()} item(s) in your cart."
 
 
@@ -52,4 +54,31 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'items', 'total_price', 'status', 'created_at']
\ No newline at end of file
+        fields = ['id', 'user', 'items', 'total_price', 'status', 'created_at']
+
+
+class ArchivedOrderItemSerializer(OrderItemSerializer):
+    class Meta(OrderItemSerializer.Meta):
+        model = ArchivedOrderItem
+
+
+class ArchivedOrderSerializer(OrderSerializer):
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields + ['archived_at']
+
+
+class OrderStatusSummarySerializer(serializers.Serializer):
+    status = serializers.CharField()
+    count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class OrderSummarySerializer(serializers.Serializer):
+    order_count = serializers.IntegerField()
+    lifetime_spend = serializers.DecimalField(max_digits=14, decimal_places=2)
+    first_order_at = serializers.DateTimeField(allow_null=True)
+    last_order_at = serializers.DateTimeField(allow_null=True)
+    by_status = OrderStatusSummarySerializer(many=True)
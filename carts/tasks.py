@@ -0,0 +1,29 @@
+"""
+Background work for orders, run by the outbox worker (python manage.py process_outbox).
+"""
+from django.core.mail import send_mail
+
+from outbox.queue import register
+from .models import Order
+
+
+@register('order.placed')
+def send_order_confirmation(payload):
+    order = Order.objects.select_related('user').get(id=payload['order_id'])
+    send_mail(
+        subject=f"Your order #{order.id} has been placed",
+        message=f"Thank you for your order. Total: {order.total_price}.",
+        from_email=None,
+        recipient_list=[order.user.email],
+    )
+
+
+@register('order.cancelled')
+def send_cancellation_notice(payload):
+    order = Order.objects.select_related('user').get(id=payload['order_id'])
+    send_mail(
+        subject=f"Your order #{order.id} has been cancelled",
+        message="Your order was cancelled and any payment will be refunded.",
+        from_email=None,
+        recipient_list=[order.user.email],
+    )
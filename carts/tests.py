@@ -1,3 +1,488 @@
-from django.test import TestCase
+import datetime
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ecom_project.idempotency import IDEMPOTENCY_HEADER
+from ecom_project.testing import (
+    QueryBudgetTestCase, create_catalog, create_order_history, create_user, fill_cart,
+)
+from carts.guest import GUEST_CART_HEADER, GuestCart
+from carts.models import ArchivedOrder, ArchivedOrderItem, Cart, CartItem, Order, StockReservation
+from carts.reservations import available_stock, held_quantities, release_expired, reserve
+from outbox.models import OutboxTask
+from outbox.queue import process_batch
+from products.models import Product, ProductListing
+from products.serializers import ProductSerializer
+
+
+class CartBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=5, products_per_category=40)
+        cls.user = create_user('shopper@example.com')
+        cls.cart = fill_cart(cls.user, cls.products[:30])
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_view_cart_with_many_lines(self):
+        response = self.assertWithinBudget('cart-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 30)
+
+    def test_view_empty_cart(self):
+        self.authenticate(create_user('browser@example.com'))
+        response = self.assertWithinBudget('cart-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [])
+        self.assertFalse(Cart.objects.filter(user__email='browser@example.com').exists())
+
+    def test_first_add_creates_the_cart(self):
+        user = create_user('newcomer@example.com')
+        self.authenticate(user)
+        response = self.assertWithinBudget('cart-list', 'POST', data={'product_id': self.products[0].id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], Cart.objects.get(user=user).id)
+
+    def test_add_new_item(self):
+        product = self.products[100]
+        response = self.assertWithinBudget('cart-list', 'POST', data={'product_id': product.id, 'quantity': 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 31)
+
+    def test_add_existing_item(self):
+        product = self.products[0]
+        response = self.assertWithinBudget('cart-list', 'POST', data={'product_id': product.id, 'quantity': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(CartItem.objects.get(cart=self.cart, product=product).quantity, 3)
+
+    def test_update_quantity(self):
+        item = self.cart.items.first()
+        response = self.assertWithinBudget('cart-detail', 'PATCH', url_kwargs={'pk': item.id}, data={'quantity': 4})
+        self.assertEqual(response.status_code, 200)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 4)
+
+    def test_remove_item(self):
+        item = self.cart.items.first()
+        response = self.assertWithinBudget('cart-detail', 'DELETE', url_kwargs={'pk': item.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(CartItem.objects.filter(id=item.id).exists())
+
+    def test_items_of_other_carts_are_not_found(self):
+        item = self.cart.items.first()
+        self.authenticate(create_user('intruder@example.com'))
+        response = self.client.patch(reverse('cart-detail', kwargs={'pk': item.id}), {'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete(reverse('cart-detail', kwargs={'pk': item.id}))
+        self.assertEqual(response.status_code, 404)
+
+
+class GuestCartTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=2, products_per_category=10, stock=5)
+        cls.user = create_user('returning@example.com')
+
+    def add(self, product, quantity=1, token=None):
+        headers = {GUEST_CART_HEADER: token} if token else None
+        return self.assertWithinBudget(
+            'cart-list', 'POST', data={'product_id': product.id, 'quantity': quantity}, headers=headers
+        )
+
+    def test_guest_cart_round_trip_never_writes_to_the_database(self):
+        response = self.add(self.products[0], 2)
+        self.assertEqual(response.status_code, 201)
+        token = response[GUEST_CART_HEADER]
+        self.assertEqual(response.data['id'], token)
+
+        self.assertEqual(self.add(self.products[0], 1, token=token).status_code, 200)
+        self.assertEqual(self.add(self.products[1], 1, token=token).status_code, 201)
+        self.assertEqual(self.add(self.products[1], 5, token=token).status_code, 400)
+
+        headers = {GUEST_CART_HEADER: token}
+        response = self.assertWithinBudget(
+            'cart-detail', 'PATCH', url_kwargs={'pk': self.products[1].id}, data={'quantity': 4}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget('cart-detail', 'DELETE', url_kwargs={'pk': self.products[0].id}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.assertWithinBudget('cart-list', 'GET', headers=headers)
+        self.assertEqual([(item['id'], item['quantity']) for item in response.data['items']], [(self.products[1].id, 4)])
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_guest_reads_render_from_the_catalog_read_model(self):
+        token = self.add(self.products[0], 2)[GUEST_CART_HEADER]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('cart-list'), headers={GUEST_CART_HEADER: token})
+        self.assertEqual(len(captured), 1)
+        self.assertIn('products_productlisting', captured[0]['sql'])
+        self.assertEqual(response.data['items'][0]['product'], ProductSerializer(self.products[0]).data)
+        self.assertEqual(response.data['grand_total'], self.products[0].price * 2)
+
+    def test_guest_adds_are_idempotent_per_cart(self):
+        token = self.add(self.products[0], 1)[GUEST_CART_HEADER]
+        headers = {GUEST_CART_HEADER: token, IDEMPOTENCY_HEADER: 'add-1'}
+        data = {'product_id': self.products[1].id, 'quantity': 2}
+        first = self.client.post(reverse('cart-list'), data, format='json', headers=headers)
+        retry = self.client.post(reverse('cart-list'), data, format='json', headers=headers)
+        self.assertEqual((first.status_code, retry.status_code), (201, 201))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(GuestCart.load(token).lines, {self.products[0].id: 1, self.products[1].id: 2})
+
+        # The same key on another guest's cart is a different request.
+        other = self.add(self.products[2], 1)[GUEST_CART_HEADER]
+        response = self.client.post(
+            reverse('cart-list'), data, format='json', headers={GUEST_CART_HEADER: other, IDEMPOTENCY_HEADER: 'add-1'}
+        )
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(GuestCart.load(other).lines[self.products[1].id], 2)
+
+    def test_unknown_token_reads_as_an_empty_cart(self):
+        response = self.assertWithinBudget('cart-list', 'GET', headers={GUEST_CART_HEADER: 'expired'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [])
+
+    def test_login_merges_the_guest_cart(self):
+        fill_cart(self.user, [self.products[0]], quantity=1)
+        token = self.add(self.products[0], 3)[GUEST_CART_HEADER]
+        self.add(self.products[1], 2, token=token)
+        self.add(self.products[2], 1, token=token)
+        # Another shopper takes all of product 2 before the guest logs in.
+        fill_cart(create_user('rival@example.com'), [self.products[2]], quantity=5)
+        reserve(CartItem.objects.get(cart__user__email='rival@example.com'))
+
+        response = self.assertWithinBudget('token_obtain_pair', 'POST', data={
+            'email': 'returning@example.com',
+            'password': 'Secret123!',
+        }, headers={GUEST_CART_HEADER: token})
+        self.assertEqual(response.status_code, 200)
+
+        lines = dict(CartItem.objects.filter(cart__user=self.user).values_list('product_id', 'quantity'))
+        self.assertEqual(lines, {self.products[0].id: 4, self.products[1].id: 2})
+        self.assertEqual(StockReservation.objects.filter(cart_item__cart__user=self.user).count(), 2)
+        self.assertIsNone(GuestCart.load(token).token)
+
+
+class StockReservationTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = create_catalog(categories=1, products_per_category=1, stock=5)[0]
+        cls.user = create_user('shopper@example.com')
+        cls.rival = create_user('rival@example.com')
+
+    def hold(self, user, quantity):
+        cart = fill_cart(user, [self.product], quantity=quantity)
+        cart_item = cart.items.get()
+        reserve(cart_item)
+        return cart_item
+
+    def expire(self, *cart_items):
+        StockReservation.objects.filter(cart_item__in=cart_items).update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+    def test_reserve_is_one_upsert(self):
+        cart_item = self.hold(self.rival, 2)
+        cart_item.quantity = 3
+        with self.assertNumQueries(1):
+            reserve(cart_item)
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.cart_item_id, reservation.quantity), (cart_item.id, 3))
+        self.assertGreater(reservation.expires_at, timezone.now())
+
+    def test_holds_block_other_carts_until_they_expire(self):
+        cart_item = self.hold(self.rival, 4)
+        self.assertEqual(available_stock(self.product), 1)
+        self.assertEqual(available_stock(self.product, exclude_cart=cart_item.cart), 5)
+
+        self.authenticate(self.user)
+        response = self.client.post(reverse('cart-list'), {'product_id': self.product.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.expire(cart_item)
+        self.assertEqual(available_stock(self.product), 5)
+        response = self.client.post(reverse('cart-list'), {'product_id': self.product.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_release_expired_deletes_only_expired_holds(self):
+        expired = [self.hold(create_user(f'lapsed{i}@example.com'), 1) for i in range(3)]
+        active = self.hold(self.rival, 1)
+        self.expire(*expired)
+
+        self.assertEqual(release_expired(batch_size=2), 3)
+        self.assertEqual(list(StockReservation.objects.values_list('cart_item_id', flat=True)), [active.id])
+        self.assertEqual(release_expired(), 0)
+
+    def test_release_expired_reservations_command(self):
+        self.expire(self.hold(self.rival, 1))
+        out = StringIO()
+        call_command('release_expired_reservations', batch_size=10, stdout=out)
+        self.assertIn("Released 1 expired reservation(s).", out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class OrderBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=5, products_per_category=40)
+        cls.user = create_user('buyer@example.com')
+        cls.orders = create_order_history(cls.user, cls.products, orders=60, items_per_order=8)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_checkout_large_cart(self):
+        fill_cart(self.user, self.products[:30], quantity=2)
+        response = self.assertWithinBudget('order-create', 'POST')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['items']), 30)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).stock, 998)
+
+    def test_checkout_without_a_cart(self):
+        response = self.assertWithinBudget('order-create', 'POST')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], "Your cart is empty. Cannot place an order.")
+
+    def test_checkout_refreshes_catalog_listings_through_the_outbox(self):
+        fill_cart(self.user, self.products[:3], quantity=2)
+        self.client.post(reverse('order-create'))
+        self.assertEqual(ProductListing.objects.get(product_id=self.products[0].id).stock, 1000)
+
+        process_batch()
+        self.assertEqual(ProductListing.objects.get(product_id=self.products[0].id).stock, 998)
+
+    def test_order_list(self):
+        response = self.assertWithinBudget('order-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 60)
+        self.assertEqual(len(response.data['results'][0]['items']), 8)
+
+    def test_order_detail(self):
+        order = self.orders[0]
+        response = self.assertWithinBudget('order-detail', 'GET', url_kwargs={'pk': order.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['items']), 8)
+
+    def test_order_detail_with_a_malformed_id(self):
+        response = self.client.get('/api/orders/abc/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_order_polling_is_conditional(self):
+        order = self.orders[0]
+        etag = self.assertWithinBudget('order-detail', 'GET', url_kwargs={'pk': order.id})['ETag']
+        response = self.assertWithinBudget(
+            'order-detail', 'GET', url_kwargs={'pk': order.id}, headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Authorization', response['Vary'])
+
+        self.client.post(reverse('order-cancel', kwargs={'pk': order.id}))
+        response = self.assertWithinBudget(
+            'order-detail', 'GET', url_kwargs={'pk': order.id}, headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'Cancelled')
+
+    def test_order_list_conditional_get(self):
+        etag = self.assertWithinBudget('order-list', 'GET')['ETag']
+        response = self.assertWithinBudget('order-list', 'GET', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_order_summary(self):
+        self.client.post(reverse('order-cancel', kwargs={'pk': self.orders[0].id}))
+        response = self.assertWithinBudget('order-summary', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order_count'], 60)
+        self.assertEqual(response.data['lifetime_spend'], '0.00')
+        self.assertEqual(
+            [(row['status'], row['count']) for row in response.data['by_status']],
+            [('Cancelled', 1), ('Pending', 59)]
+        )
+
+    def test_order_summary_without_orders(self):
+        self.authenticate(create_user('newbie@example.com'))
+        response = self.assertWithinBudget('order-summary', 'GET')
+        self.assertEqual(response.data['order_count'], 0)
+        self.assertEqual(response.data['by_status'], [])
+
+    def test_cancel(self):
+        order = self.orders[0]
+        response = self.assertWithinBudget('order-cancel', 'POST', url_kwargs={'pk': order.id})
+        self.assertEqual(response.status_code, 200)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatus.CANCELLED)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).stock, 1001)
+
+    def test_cancelling_twice_restocks_once(self):
+        order = self.orders[0]
+        product_ids = list(order.items.values_list('product_id', flat=True))
+        rival = create_user('rival@example.com')
+        reserve(fill_cart(rival, [self.products[0]], quantity=3).items.get())
+
+        self.client.post(reverse('order-cancel', kwargs={'pk': order.id}))
+        stock = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'stock'))
+        holds = list(StockReservation.objects.values_list('cart_item_id', 'quantity', 'expires_at'))
+
+        response = self.assertWithinBudget('order-cancel', 'POST', url_kwargs={'pk': order.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(dict(Product.objects.filter(id__in=product_ids).values_list('id', 'stock')), stock)
+        self.assertEqual(list(StockReservation.objects.values_list('cart_item_id', 'quantity', 'expires_at')), holds)
+
+
+class IdempotencyTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, products_per_category=5)
+        cls.user = create_user('retrier@example.com')
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+        fill_cart(self.user, self.products[:2])
+
+    def checkout(self, key):
+        return self.client.post(reverse('order-create'), headers={IDEMPOTENCY_HEADER: key})
+
+    def test_retry_replays_the_first_response(self):
+        first = self.checkout('key-1')
+        retry = self.checkout('key-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_key_reused_with_a_different_request(self):
+        url = reverse('cart-list')
+        headers = {IDEMPOTENCY_HEADER: 'key-2'}
+        self.client.post(url, {'product_id': self.products[0].id, 'quantity': 1}, format='json', headers=headers)
+        response = self.client.post(url, {'product_id': self.products[1].id, 'quantity': 1}, format='json', headers=headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_retry_while_the_first_request_is_running(self):
+        concurrent = []
+
+        def retry_during_checkout(*args, **kwargs):
+            if not concurrent:
+                concurrent.append(self.checkout('key-3'))
+            return held_quantities(*args, **kwargs)
+
+        with mock.patch('carts.views.held_quantities', side_effect=retry_during_checkout):
+            response = self.checkout('key-3')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(concurrent[0].status_code, 409)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_key_is_released_after_a_server_error(self):
+        self.client.raise_request_exception = False
+        with mock.patch('carts.views.held_quantities', side_effect=RuntimeError("database down")):
+            self.assertEqual(self.checkout('key-4').status_code, 500)
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
+
+        response = self.checkout('key-4')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+
+class OrderArchiveTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=2, products_per_category=10)
+        cls.user = create_user('loyal@example.com')
+        cls.orders = create_order_history(cls.user, cls.products, orders=30, items_per_order=4)
+        old = timezone.now() - datetime.timedelta(days=400)
+        # 20 old orders: 10 delivered, 5 cancelled and 5 still pending (never archived).
+        Order.objects.filter(id__in=[order.id for order in cls.orders[:20]]).update(created_at=old)
+        Order.objects.filter(id__in=[order.id for order in cls.orders[:10]]).update(status=Order.OrderStatus.DELIVERED)
+        Order.objects.filter(id__in=[order.id for order in cls.orders[10:15]]).update(status=Order.OrderStatus.CANCELLED)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.user)
+
+    def test_archive_moves_old_finished_orders(self):
+        summary_before = self.client.get(reverse('order-summary')).data
+        call_command('archive_orders', batch_size=4, stdout=StringIO())
+
+        self.assertEqual(ArchivedOrder.objects.count(), 15)
+        self.assertEqual(ArchivedOrderItem.objects.count(), 60)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 15)
+        self.assertFalse(Order.objects.filter(id=self.orders[0].id).exists())
+        self.assertEqual(ArchivedOrder.objects.get(id=self.orders[0].id).items.count(), 4)
+
+        # Moving rows between tables does not change the user's totals.
+        self.assertEqual(self.client.get(reverse('order-summary')).data, summary_before)
+
+        response = self.assertWithinBudget('order-archived', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results'][0]['items']), 4)
+
+    def test_dry_run_and_recent_orders(self):
+        out = StringIO()
+        call_command('archive_orders', dry_run=True, stdout=out)
+        self.assertIn('15 order(s)', out.getvalue())
+        call_command('archive_orders', older_than_days=500, stdout=StringIO())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+
+class AdminPageTests(QueryBudgetTestCase):
+    """
+    Admin pages over large order and cart tables must not count or load rows one at a time.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=5, products_per_category=40)
+        cls.admin = create_user('admin@example.com', is_staff=True)
+        cls.orders = create_order_history(cls.admin, cls.products, orders=60, items_per_order=8)
+        cls.cart = fill_cart(cls.admin, cls.products[:20])
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_changelists(self):
+        self.assertPageQueries(reverse('admin:carts_order_changelist'), 4)
+        self.assertPageQueries(reverse('admin:carts_cart_changelist'), 4)
+
+    def test_change_forms(self):
+        self.assertPageQueries(reverse('admin:carts_order_change', args=[self.orders[0].id]), 9)
+        self.assertPageQueries(reverse('admin:carts_cart_change', args=[self.cart.id]), 9)
+
+
+class OrderAdminTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, products_per_category=5)
+        cls.admin = create_user('admin@example.com', is_staff=True)
+        cls.orders = create_order_history(create_user('buyer@example.com'), cls.products, orders=2, items_per_order=2)
+        Order.objects.filter(id=cls.orders[1].id).update(status=Order.OrderStatus.DELIVERED)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_cancel_action_restocks(self):
+        response = self.client.post(reverse('admin:carts_order_changelist'), {
+            'action': 'cancel_orders', '_selected_action': [order.id for order in self.orders],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get(id=self.orders[0].id).status, Order.OrderStatus.CANCELLED)
+        self.assertEqual(Order.objects.get(id=self.orders[1].id).status, Order.OrderStatus.DELIVERED)
+        self.assertEqual(Product.objects.get(id=self.products[0].id).stock, 1001)
+        self.assertTrue(OutboxTask.objects.filter(topic='order.cancelled', payload__order_id=self.orders[0].id).exists())
+
+    def test_status_is_read_only(self):
+        response = self.client.get(reverse('admin:carts_order_change', args=[self.orders[0].id]))
+        self.assertNotContains(response, 'name="status"')
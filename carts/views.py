@@ -1,37 +1,120 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
+from django.db.models import Case, Count, F, Max, Min, Sum, Value, When, prefetch_related_objects
+from django.http import Http404
+from django.utils import timezone
 from rest_framework import viewsets, status, permissions, generics
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.views import TokenObtainPairView
 
-from .models import Cart, CartItem, Order, OrderItem
-from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+from .guest import GUEST_CART_HEADER, GuestCart, merge_guest_cart
+from .models import ArchivedOrder, Cart, CartItem, Order, OrderItem
+from .orders import cancel_order
+from .reservations import available_stock, held_quantities, reserve
+from .serializers import (
+    EMPTY_CART_MESSAGE, ArchivedOrderSerializer, CartSerializer, CartItemSerializer, OrderSerializer,
+    OrderSummarySerializer,
+)
 from products.models import Product
+from products.snapshots import get_snapshot, invalidate_snapshots
+from ecom_project.db_routers import ReplicaReadMixin, PrimaryStickyMixin
+from ecom_project.conditional import collection_validators, make_etag, not_modified_response, set_validators
+from ecom_project.idempotency import idempotent
+from ecom_project.throttling import LoginThrottle, ThrottleFirstMixin
+from outbox.queue import enqueue
+
+def _prefetch_cart(cart):
+    """
+    Loads the cart's items and their products up front, so serializing
+    the cart costs the same number of queries however many lines it has.
+    """
+    prefetch_related_objects([cart], 'items__product')
+    return cart
+
+
+def _empty_cart_data(user):
+    """
+    What CartSerializer renders for a cart with no items, for users
+    who have not added anything yet and so have no Cart row.
+    """
+    return {
+        'id': None,
+        'user': user.pk,
+        'items': [],
+        'grand_total': 0,
+        'created_at': None,
+        'message': EMPTY_CART_MESSAGE,
+    }
+
+
+def _product_snapshot(product_id):
+    try:
+        return get_snapshot(int(product_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_guest_cart(request):
+    return GuestCart.load(request.headers.get(GUEST_CART_HEADER))
+
+
+def _guest_line_id(pk):
+    # Guest cart lines are addressed by product id.
+    try:
+        return int(pk)
+    except (TypeError, ValueError):
+        return None
 
-class CartViewSet(viewsets.ViewSet):
+
+def _guest_response(cart, status_code=status.HTTP_200_OK):
+    response = Response(cart.to_representation(), status=status_code)
+    if cart.token is not None:
+        response[GUEST_CART_HEADER] = cart.token
+    return response
+
+
+class CartViewSet(PrimaryStickyMixin, viewsets.ViewSet):
     """
     A ViewSet for viewing and managing the user's cart.
     - list: GET /api/cart/ (View your cart)
     - create: POST /api/cart/ (Add an item)
     - partial_update: PATCH /api/cart/{item_id}/ (Update item quantity)
     - destroy: DELETE /api/cart/{item_id}/ (Remove an item)
+    Anonymous users get a guest cart kept in the cache (see carts/guest.py),
+    identified by the X-Cart-Token header.
     """
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.AllowAny]
+
+    def anonymous_idempotency_scope(self, request):
+        # Guests' Idempotency-Keys are scoped by their cart. A guest's first add,
+        # which has no cart token yet, cannot be deduplicated.
+        return request.headers.get(GUEST_CART_HEADER)
 
     def list(self, request):
         """
         Retrieves the authenticated user's cart.
-        Creates a cart if one doesn't exist.
+        Users without a cart get an empty one back; nothing is written.
         """
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        if not request.user.is_authenticated:
+            return _guest_response(_load_guest_cart(request))
+
+        cart = Cart.objects.filter(user=request.user).first()
+        if cart is None:
+            return Response(_empty_cart_data(request.user))
+        serializer = CartSerializer(_prefetch_cart(cart))
         return Response(serializer.data)
 
+    @idempotent
     def create(self, request):
         """
         Add a product to the cart or update its quantity if it already exists.
+        Retries that carry the same Idempotency-Key header are not applied twice.
         """
-        cart, created = Cart.objects.get_or_create(user=request.user)
         product_id = request.data.get('product_id')
         quantity = int(request.data.get('quantity', 1))
 
@@ -44,42 +127,63 @@ class CartViewSet(viewsets.ViewSet):
         if not product_id:
             return Response({"detail": "Product ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+        # A cached price/stock snapshot turns away unknown products and quantities
+        # that could never fit without touching the products table.
+        snapshot = _product_snapshot(product_id)
+        if snapshot is None:
             return Response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        if quantity > product.stock:
+        if quantity > snapshot.stock:
             return Response({"detail": "Not enough stock available."}, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, product=product)
-        
-        if not created:
-            cart_item.quantity += quantity
-        else:
-            cart_item.quantity = quantity
-            
-        if cart_item.quantity > product.stock:
-            return Response({"detail": "Total quantity exceeds available stock."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        cart_item.save()
-        
-        serializer = CartSerializer(cart)
+        if not request.user.is_authenticated:
+            return self._guest_create(request, snapshot, quantity)
+
+        # The product row is locked only while the hold is placed, so concurrent
+        # adds of the same product cannot reserve more than is in stock.
+        with transaction.atomic():
+            try:
+                product = Product.objects.select_for_update().only('id', 'stock').get(id=snapshot.id)
+            except Product.DoesNotExist:
+                return Response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+
+            cart = Cart.objects.filter(user=request.user).first()
+            available = available_stock(product, exclude_cart=cart)
+            if quantity > available:
+                return Response({"detail": "Not enough stock available."}, status=status.HTTP_400_BAD_REQUEST)
+
+            # The cart itself is only created when its first item goes in.
+            if cart is None:
+                cart, _ = Cart.objects.get_or_create(user=request.user)
+                cart_item = None
+            else:
+                cart_item = CartItem.objects.filter(cart=cart, product=product).first()
+            created = cart_item is None
+            if created:
+                cart_item = CartItem(cart=cart, product=product, quantity=quantity)
+            else:
+                cart_item.quantity += quantity
+
+            if cart_item.quantity > available:
+                return Response({"detail": "Total quantity exceeds available stock."}, status=status.HTTP_400_BAD_REQUEST)
+
+            cart_item.save()
+            reserve(cart_item)
+
+        serializer = CartSerializer(_prefetch_cart(cart))
         return Response(serializer.data, status=status.HTTP_200_OK if not created else status.HTTP_201_CREATED)
 
     def partial_update(self, request, pk=None):
         """
         Update the quantity of a specific item in the cart.
         """
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-             return Response({"detail": "You do not have a cart."}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_authenticated:
+            return self._guest_partial_update(request, pk)
 
         try:
-            cart_item = CartItem.objects.get(id=pk, cart=cart)
+            cart_item = CartItem.objects.select_related('cart').get(id=pk, cart__user=request.user)
         except CartItem.DoesNotExist:
             return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
+        cart = cart_item.cart
 
         quantity = request.data.get('quantity')
         if quantity is None:
@@ -90,7 +194,7 @@ class CartViewSet(viewsets.ViewSet):
             if quantity <= 0:
                 cart_item.delete()
                 # Use a new CartSerializer to reflect the updated cart state after deletion
-                serializer = CartSerializer(cart)
+                serializer = CartSerializer(_prefetch_cart(cart))
                 return Response(
                     {"detail": "Cart item removed due to zero quantity.", "cart": serializer.data},
                     status=status.HTTP_200_OK
@@ -98,27 +202,28 @@ class CartViewSet(viewsets.ViewSet):
         except (ValueError, TypeError):
             return Response({"detail": "Quantity must be a valid integer."}, status=status.HTTP_400_BAD_REQUEST)
             
-        if quantity > cart_item.product.stock:
-            return Response({"detail": "Quantity exceeds available stock."}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            product = Product.objects.select_for_update().only('id', 'stock').get(id=cart_item.product_id)
+            if quantity > available_stock(product, exclude_cart=cart):
+                return Response({"detail": "Quantity exceeds available stock."}, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_item.quantity = quantity
-        cart_item.save()
+            cart_item.quantity = quantity
+            cart_item.save()
+            reserve(cart_item)
 
         # Return the entire cart state so the frontend can update totals
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(_prefetch_cart(cart))
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, pk=None):
         """
         Remove an item from the cart entirely.
         """
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response({"detail": "You do not have a cart."}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_authenticated:
+            return self._guest_destroy(request, pk)
 
         try:
-            cart_item = CartItem.objects.get(id=pk, cart=cart)
+            cart_item = CartItem.objects.get(id=pk, cart__user=request.user)
         except CartItem.DoesNotExist:
             return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
 
@@ -129,16 +234,76 @@ class CartViewSet(viewsets.ViewSet):
             status=status.HTTP_200_OK
         )
 
+    # Guest carts validate against product snapshots; the cart itself lives in the cache.
+
+    def _guest_create(self, request, product, quantity):
+        cart = _load_guest_cart(request)
+        created = product.id not in cart.lines
+        total = cart.lines.get(product.id, 0) + quantity
+        if total > available_stock(product):
+            return Response({"detail": "Not enough stock available."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cart.lines[product.id] = total
+        cart.save()
+        return _guest_response(cart, status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def _guest_partial_update(self, request, pk):
+        cart = _load_guest_cart(request)
+        product_id = _guest_line_id(pk)
+        if product_id not in cart.lines:
+            return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        quantity = request.data.get('quantity')
+        if quantity is None:
+            return Response({"detail": "Quantity is required for an update."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            quantity = int(quantity)
+        except (ValueError, TypeError):
+            return Response({"detail": "Quantity must be a valid integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if quantity <= 0:
+            del cart.lines[product_id]
+            cart.save()
+            return Response(
+                {"detail": "Cart item removed due to zero quantity.", "cart": cart.to_representation()},
+                status=status.HTTP_200_OK
+            )
+
+        product = _product_snapshot(product_id)
+        if product is None or quantity > available_stock(product):
+            return Response({"detail": "Quantity exceeds available stock."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cart.lines[product_id] = quantity
+        cart.save()
+        return _guest_response(cart)
+
+    def _guest_destroy(self, request, pk):
+        cart = _load_guest_cart(request)
+        product_id = _guest_line_id(pk)
+        if product_id not in cart.lines:
+            return Response({"detail": "Cart item not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        del cart.lines[product_id]
+        cart.save()
+        return Response(
+            {"detail": "Item removed from cart successfully."},
+            status=status.HTTP_200_OK
+        )
+
 
 # === ORDER VIEWS ===
 
-class OrderViewSet(viewsets.ReadOnlyModelViewSet):
+class OrderViewSet(ReplicaReadMixin, PrimaryStickyMixin, viewsets.ReadOnlyModelViewSet):
     """
     A read-only ViewSet for users to view their orders.
     Also allows a user to cancel a 'Pending' order.
+    Order history is read from the replica; cancel always runs on the primary.
     - list: GET /api/orders/ (View your order history)
     - retrieve: GET /api/orders/{id}/ (View a specific order)
     - cancel: POST /api/orders/{id}/cancel/ (Cancel a pending order)
+    - summary: GET /api/orders/summary/ (Order count, lifetime spend and status breakdown)
+    - archived: GET /api/orders/archived/ (View your archived orders)
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -148,91 +313,217 @@ class OrderViewSet(viewsets.ReadOnlyModelViewSet):
         This view should return a list of all the orders
         for the currently authenticated user.
         """
-        return Order.objects.filter(user=self.request.user)
+        return (
+            Order.objects.filter(user=self.request.user)
+            .select_related('user')
+            .prefetch_related('items__product')
+        )
 
     def list(self, request, *args, **kwargs):
         """
         Custom list method to add a message for users with no orders.
+        Answers conditional requests with a 304 when no order has changed.
         """
         queryset = self.get_queryset()
-        if not queryset.exists():
+        count, last_modified = collection_validators(queryset)
+        if not count:
             return Response(
                 {"message": "You have not placed any orders yet."},
                 status=status.HTTP_200_OK
             )
-        
+
+        etag = make_etag(request, count, last_modified)
+        not_modified = not_modified_response(request, etag, last_modified, private=True)
+        if not_modified is not None:
+            return not_modified
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return set_validators(self.get_paginated_response(serializer.data), etag, last_modified, private=True)
 
         serializer = self.get_serializer(queryset, many=True)
+        return set_validators(Response(serializer.data), etag, last_modified, private=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Checks the order's updated_at first, so polling an unchanged order
+        costs one small query and no serialization.
+        """
+        try:
+            pk = Order._meta.pk.to_python(kwargs['pk'])
+        except DjangoValidationError:
+            raise Http404
+        last_modified = (
+            Order.objects.filter(user=request.user, pk=pk)
+            .values_list('updated_at', flat=True)
+            .first()
+        )
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = make_etag(request, last_modified)
+        not_modified = not_modified_response(request, etag, last_modified, private=True)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified, private=True)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Totals over the user's whole order history, live and archived, with one
+        GROUP BY status query per table. Lifetime spend leaves out cancelled orders.
+        """
+        totals = {}
+        for model in (Order, ArchivedOrder):
+            rows = (
+                model.objects.filter(user=request.user).order_by()
+                .values('status')
+                .annotate(count=Count('id'), total=Sum('total_price'), first=Min('created_at'), last=Max('created_at'))
+            )
+            for row in rows:
+                merged = totals.setdefault(row['status'], row)
+                if merged is not row:
+                    merged['count'] += row['count']
+                    merged['total'] += row['total']
+                    merged['first'] = min(merged['first'], row['first'])
+                    merged['last'] = max(merged['last'], row['last'])
+
+        rows = [totals[status] for status in sorted(totals)]
+        labels = dict(Order.OrderStatus.choices)
+        serializer = OrderSummarySerializer({
+            'order_count': sum(row['count'] for row in rows),
+            'lifetime_spend': sum(
+                (row['total'] for row in rows if row['status'] != Order.OrderStatus.CANCELLED), Decimal('0.00')
+            ),
+            'first_order_at': min((row['first'] for row in rows), default=None),
+            'last_order_at': max((row['last'] for row in rows), default=None),
+            'by_status': [
+                {'status': labels[row['status']], 'count': row['count'], 'total': row['total']}
+                for row in rows
+            ],
+        })
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """
+        The user's archived orders (delivered or cancelled long ago), newest first.
+        They live in a separate table, so the regular order list stays small.
+        """
+        queryset = (
+            ArchivedOrder.objects.filter(user=request.user)
+            .select_related('user')
+            .prefetch_related('items__product')
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(ArchivedOrderSerializer(page, many=True).data)
+        return Response(ArchivedOrderSerializer(queryset, many=True).data)
+
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """
         Allows a user to cancel their own order if it is still pending.
         """
         order = self.get_object()
-        
-        if order.status != Order.OrderStatus.PENDING:
+
+        if not cancel_order(order):
             return Response(
                 {"detail": "This order can no longer be cancelled."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        with transaction.atomic():
-            order.status = Order.OrderStatus.CANCELLED
-            order.save()
-
-            for item in order.items.all():
-                product = item.product
-                product.stock += item.quantity
-                product.save()
-
         serializer = self.get_serializer(order)
         return Response(
             {"detail": "Order has been successfully cancelled.", "order": serializer.data},
             status=status.HTTP_200_OK
         )
 
-class OrderCreateView(generics.GenericAPIView):
+class OrderCreateView(PrimaryStickyMixin, generics.GenericAPIView):
     """
     An API view to create an order from the user's cart.
     - post: POST /api/orders/create/ (Places an order)
+    Send an Idempotency-Key header to make retries return the original order.
     """
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent
     def post(self, request, *args, **kwargs):
         try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            raise ValidationError("You do not have a cart.")
+            with transaction.atomic():
+                # Users without a cart simply have no lines here.
+                cart_items = list(CartItem.objects.filter(cart__user=request.user))
+                if not cart_items:
+                    raise ValidationError("Your cart is empty. Cannot place an order.")
+                cart_id = cart_items[0].cart_id
+                product_ids = [item.product_id for item in cart_items]
+                # Lock every product in one query, in a stable order to avoid deadlocks.
+                products = {
+                    product.id: product
+                    for product in Product.objects.select_for_update().filter(id__in=product_ids).order_by('id')
+                }
+                # Stock held by other carts is not ours to sell; our own holds are.
+                held_by_others = held_quantities(product_ids, exclude_cart=cart_id)
 
-        if cart.items.count() == 0:
-            raise ValidationError("Your cart is empty. Cannot place an order.")
+                for cart_item in cart_items:
+                    product = products[cart_item.product_id]
+                    if product.stock - held_by_others.get(product.id, 0) < cart_item.quantity:
+                        raise ValidationError(f"Not enough stock for {product.name}. Order cannot be placed.")
 
-        try:
-            with transaction.atomic():
                 order = Order.objects.create(
                     user=request.user,
-                    total_price=sum(item.total_price for item in cart.items.all())
+                    total_price=sum(products[item.product_id].price * item.quantity for item in cart_items)
                 )
-                for cart_item in cart.items.all():
-                    product = Product.objects.select_for_update().get(id=cart_item.product.id)
-                    if product.stock < cart_item.quantity:
-                        raise ValidationError(f"Not enough stock for {product.name}. Order cannot be placed.")
-                    OrderItem.objects.create(
+                OrderItem.objects.bulk_create([
+                    OrderItem(
                         order=order,
-                        product=product,
+                        product=products[cart_item.product_id],
                         quantity=cart_item.quantity,
-                        price=product.price
+                        price=products[cart_item.product_id].price
                     )
-                    product.stock -= cart_item.quantity
-                    product.save()
-                cart.items.all().delete()
+                    for cart_item in cart_items
+                ])
+                # Decrement every product in a single UPDATE ... SET stock = stock - CASE ... END.
+                Product.objects.filter(id__in=products).update(
+                    stock=F('stock') - Case(
+                        *[When(id=item.product_id, then=Value(item.quantity)) for item in cart_items],
+                        default=Value(0)
+                    ),
+                    updated_at=timezone.now()
+                )
+                # Deleting the cart lines also releases their reservations.
+                CartItem.objects.filter(cart_id=cart_id).delete()
+                # Notifications and other follow-up work run in the outbox worker.
+                enqueue('order.placed', order_id=order.id)
+                enqueue('sales.rollup', order_id=order.id, day=timezone.localdate(order.created_at).isoformat(), sign=1)
+                enqueue('catalog.refresh', product_ids=product_ids)
+                invalidate_snapshots(product_ids)
+            prefetch_related_objects([order], 'items__product')
             serializer = OrderSerializer(order)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except ValidationError as e:
-            return Response({"detail": str(e.detail[0])}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"detail": str(e.detail[0])}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class GuestCartTokenObtainPairView(ThrottleFirstMixin, TokenObtainPairView):
+    """
+    The JWT login view, extended to merge the caller's guest cart.
+    Rate limited per IP address (the 'login' throttle scope) against credential stuffing.
+    - post: POST /api/token/ (Send the X-Cart-Token header to keep the guest cart)
+    """
+    throttle_classes = [LoginThrottle]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        token = request.headers.get(GUEST_CART_HEADER)
+        if token:
+            merge_guest_cart(token, serializer.user)
+        return Response(serializer.validated_data, status=status.HTTP_200_OK)
@@ -0,0 +1,56 @@
+"""
+Helpers for keeping Django admin changelists fast on large tables.
+
+``LargeTableAdmin`` is the base ModelAdmin for big tables. It paginates with
+``EstimatedCountPaginator``, which takes the row count of an unfiltered table
+from PostgreSQL's planner statistics instead of running ``COUNT(*)``, and it
+turns off the second, unfiltered count the admin shows next to search results.
+Subclasses should still set ``list_select_related`` and use raw-id or
+autocomplete widgets for foreign keys, so a changelist or change form never
+loads related rows one at a time.
+"""
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimated_row_count(model, using='default'):
+    """
+    Returns PostgreSQL's estimate of the table's row count, or None when no
+    estimate is available (other databases, or a table that was never analyzed).
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that trusts the planner's row estimate for unfiltered querysets
+    over large tables. Filtered querysets, and tables small enough for an exact
+    count to be cheap, are counted exactly.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate > self.exact_count_threshold:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
@@ -0,0 +1,158 @@
+"""
+Batched API requests.
+
+``POST /api/batch/`` takes a list of sub-requests to other API routes and
+returns all of their responses in one payload, so a client page load that
+needs the profile, the cart, the order list and a few products makes one
+round trip instead of many. The batch request is authenticated once and
+the resulting user is handed to every sub-request, so the JWT is decoded
+and the user loaded a single time. Sub-requests are dispatched in-process,
+one after the other on the same thread and database connection, straight
+to the view: the middleware stack runs once, for the batch request.
+
+Each sub-request still goes through its view's permission checks and
+throttles, and can only set the few request headers the API reads. A
+sub-request that fails, even with an unhandled exception, gets an error
+entry of its own and does not stop the others.
+"""
+import json
+import logging
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve, reverse
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Request metadata that sub-requests inherit from the batch request.
+INHERITED_META = ('REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'HTTP_HOST', 'HTTP_USER_AGENT', 'wsgi.url_scheme')
+
+# The only request headers a sub-request may set: the ones the API's views read.
+# Anything else (Host, X-Forwarded-For, ...) could impersonate another host or client.
+SUB_REQUEST_HEADERS = ('Idempotency-Key', 'If-None-Match', 'If-Modified-Since', 'X-Cart-Token')
+
+# Response headers that are meaningless once the body is embedded in the batch payload.
+DROPPED_HEADERS = {'content-length', 'content-type', 'vary', 'allow', 'x-frame-options'}
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=BATCH_METHODS)
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/'):
+            raise serializers.ValidationError("Only /api/ routes can be batched.")
+        if path == reverse('batch'):
+            raise serializers.ValidationError("Batch requests cannot be nested.")
+        return value
+
+    def validate_headers(self, value):
+        allowed = {name.lower() for name in SUB_REQUEST_HEADERS}
+        rejected = sorted(name for name in value if name.lower() not in allowed)
+        if rejected:
+            raise serializers.ValidationError(
+                f"Unsupported headers: {', '.join(rejected)}. Allowed: {', '.join(SUB_REQUEST_HEADERS)}."
+            )
+        return value
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = serializers.ListField(child=SubRequestSerializer(), allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests can be batched.")
+        return value
+
+
+def _build_request(request, spec):
+    """
+    Builds the Django request for one sub-request, authenticated as the batch request's user.
+    """
+    url = urlsplit(spec['path'])
+    body = json.dumps(spec['body']).encode() if 'body' in spec else b''
+    environ = {key: request.META[key] for key in INHERITED_META if key in request.META}
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SCRIPT_NAME': '',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    })
+    for name, value in spec.get('headers', {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    sub_request = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        # DRF's forced authentication: the sub-request skips its authentication
+        # classes and uses the user and token the batch request was authenticated with.
+        # Anonymous sub-requests carry no credentials and authenticate as usual, for free.
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _response_entry(response):
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    body = None
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset)
+    return {
+        'status': response.status_code,
+        'headers': {name: value for name, value in response.items() if name.lower() not in DROPPED_HEADERS},
+        'body': body,
+    }
+
+
+def dispatch(request, spec):
+    """
+    Runs one sub-request and returns its entry for the batch response.
+    """
+    sub_request = _build_request(request, spec)
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        return {'status': status.HTTP_404_NOT_FOUND, 'headers': {}, 'body': {"detail": "Not found."}}
+    sub_request.resolver_match = match
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        return _response_entry(response)
+    except Exception:
+        logger.exception("Batched %s %s failed", spec['method'], spec['path'])
+        return {
+            'status': status.HTTP_500_INTERNAL_SERVER_ERROR,
+            'headers': {},
+            'body': {"detail": "A server error occurred."},
+        }
+
+
+class BatchView(APIView):
+    """
+    Runs several API requests in one round trip.
+    - post: POST /api/batch/ ({"requests": [{"method": "GET", "path": "/api/cart/"}, ...]})
+    Returns {"responses": [{"status", "headers", "body"}, ...]} in request order.
+    Sub-requests run with the batch request's credentials; send none for anonymous requests.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = [dispatch(request, spec) for spec in serializer.validated_data['requests']]
+        return Response({"responses": responses}, status=status.HTTP_200_OK)
@@ -0,0 +1,57 @@
+"""
+Conditional GET support (ETag / Last-Modified) for API views.
+
+Validators are built from ``updated_at`` columns: a single
+``COUNT``/``MAX(updated_at)`` query for a collection, or the object's own
+``updated_at`` for a detail view. A client sending a matching
+``If-None-Match`` or ``If-Modified-Since`` header gets a 304 Not Modified
+before anything is serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def collection_validators(queryset, field='updated_at'):
+    """
+    Returns (row count, latest ``field`` value) for the queryset in one query.
+    Together they change whenever a row is added, removed or updated.
+    """
+    stats = queryset.order_by().aggregate(count=Count('pk'), last_modified=Max(field))
+    return stats['count'], stats['last_modified']
+
+
+def make_etag(request, *parts):
+    """
+    Builds a weak ETag from the request URL (path, filters, page), the user and the given parts.
+    """
+    user_id = request.user.pk if request.user.is_authenticated else None
+    raw = '|'.join([request.get_full_path(), str(user_id), *map(str, parts)])
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def not_modified_response(request, etag, last_modified, private=False):
+    """
+    Returns a 304 response if the client's cached copy is still current, otherwise None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified, private=private)
+    return response
+
+
+def set_validators(response, etag, last_modified, private=False):
+    """
+    Adds ETag/Last-Modified to a response and asks clients to revalidate before reuse.
+    Per-user responses should pass ``private=True``.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, no_cache=True, private=private or None)
+    if private:
+        patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,108 @@
+"""
+Primary/replica database routing.
+
+Every query goes to the primary ('default') unless a 'replica' database is
+configured, ``DATABASE_REPLICA_READS`` is on and the view handling the request
+opts in with ``ReplicaReadMixin``.
+Users who have just written something are pinned to the primary for a short
+window (``REPLICA_STICKY_SECONDS``) so they always read their own writes, even
+while the replica is lagging behind.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_DB_ALIAS = 'default'
+REPLICA_DB_ALIAS = 'replica'
+
+# The alias reads should use for the request currently being handled.
+# None lets Django fall back to the primary.
+_read_db_alias = contextvars.ContextVar('read_db_alias', default=None)
+
+
+def _sticky_cache_key(user_id):
+    return f'db:pin-primary:{user_id}'
+
+
+def pin_user_to_primary(user):
+    """
+    Sends the user's reads to the primary for the next few seconds.
+    """
+    if user is None or not user.is_authenticated:
+        return
+    cache.set(_sticky_cache_key(user.pk), 1, settings.REPLICA_STICKY_SECONDS)
+
+
+def replica_configured():
+    return settings.DATABASE_REPLICA_READS and REPLICA_DB_ALIAS in settings.DATABASES
+
+
+def is_pinned_to_primary(user):
+    if user is None or not user.is_authenticated:
+        return False
+    return cache.get(_sticky_cache_key(user.pk)) is not None
+
+
+class PrimaryReplicaRouter:
+    """
+    Routes reads to the alias chosen for the current request and
+    all writes to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_db_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases point at the same data, so relations are always valid.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication.
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    View mixin that serves safe-method requests (GET, HEAD, OPTIONS) from the
+    read replica, unless the user was recently pinned to the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication runs in super().initial(), so request.user is known afterwards.
+        super().initial(request, *args, **kwargs)
+        if (
+            replica_configured()
+            and request.method in SAFE_METHODS
+            and not is_pinned_to_primary(request.user)
+        ):
+            self._read_db_token = _read_db_alias.set(REPLICA_DB_ALIAS)
+
+    def dispatch(self, request, *args, **kwargs):
+        # Reset in a finally block: an unhandled exception skips finalize_response(),
+        # and the alias would otherwise leak into the next request on this thread.
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            token = getattr(self, '_read_db_token', None)
+            if token is not None:
+                _read_db_alias.reset(token)
+                self._read_db_token = None
+
+
+class PrimaryStickyMixin:
+    """
+    View mixin that pins the user to the primary after any successful
+    write request, giving read-your-writes consistency on replica-backed views.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_user_to_primary(getattr(request, 'user', None))
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,114 @@
+"""
+Support for the ``Idempotency-Key`` request header.
+
+Clients that retry a POST after a timeout send the same key again. The first
+request runs normally and its response is stored in the cache together with a
+fingerprint of the request; retries with the same key get the stored response
+back without running the view again.
+
+Keys are scoped per user. Views that serve anonymous clients can scope their
+keys by something the client sends instead (e.g. the guest cart token) with
+an ``anonymous_idempotency_scope(request)`` method.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# Stored while the first request with a key is still running.
+_IN_PROGRESS = 'in-progress'
+
+
+def _request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    raw = f"{request.method}:{request.path}:{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _scope(view, request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    get_scope = getattr(view, 'anonymous_idempotency_scope', None)
+    scope = get_scope(request) if get_scope is not None else None
+    return f"anonymous:{scope}" if scope else None
+
+
+def idempotent(view_method):
+    """
+    Decorator for DRF view methods (e.g. ``post`` or ``create``) that
+    makes them safe to retry with an ``Idempotency-Key`` header.
+    Requests without the header, or anonymous requests the view cannot
+    scope, are handled as usual.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        scope = _scope(self, request) if key else None
+        if scope is None:
+            return view_method(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Keys are scoped per user (or guest) and per endpoint.
+        cache_key = f"idempotency:{scope}:{request.path}:{key}"
+        fingerprint = _request_fingerprint(request)
+
+        # cache.add is atomic: only the first request with this key gets to run the view.
+        if not cache.add(cache_key, (fingerprint, _IN_PROGRESS), settings.IDEMPOTENCY_LOCK_SECONDS):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            # The entry expired between add() and get(); ask the client to retry.
+            return Response(
+                {"detail": "A request with this Idempotency-Key is already being processed."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            # Server errors are not final, so the client may retry them for real.
+            cache.delete(cache_key)
+        else:
+            cache.set(
+                cache_key,
+                (fingerprint, (response.status_code, response.data)),
+                settings.IDEMPOTENCY_KEY_TTL_SECONDS
+            )
+        return response
+
+    return wrapper
+
+
+def _replay(stored, fingerprint):
+    stored_fingerprint, result = stored
+    if stored_fingerprint != fingerprint:
+        return Response(
+            {"detail": f"This {IDEMPOTENCY_HEADER} was already used with a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if result == _IN_PROGRESS:
+        return Response(
+            {"detail": "A request with this Idempotency-Key is already being processed."},
+            status=status.HTTP_409_CONFLICT
+        )
+    status_code, data = result
+    response = Response(data, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
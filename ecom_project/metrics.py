@@ -0,0 +1,244 @@
+"""
+Per-route request metrics.
+
+``RequestMetricsMiddleware`` samples requests (``METRICS_SAMPLE_RATE``) and, for
+each sampled request, records the number of queries, total DB time, the time
+spent in the view outside the database (where serializers turn model
+instances into data), response render time (encoding that data as JSON) and
+response size. The numbers are aggregated into fixed-bucket histograms per
+route name (e.g. ``public-product-list`` or ``order-create``), which admins can
+read from ``GET /api/metrics/``, and can also be sent back to the client in a
+``Server-Timing`` header (``METRICS_SERVER_TIMING_HEADER``, off by default).
+
+The histograms live in memory, so each worker process reports its own numbers.
+"""
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram. Quantiles are estimated as the upper bound of
+    the bucket they fall in, which is plenty to spot a slow endpoint.
+    """
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        # Beyond the last bound: the best we can say is "more than the last bucket".
+        return float('inf')
+
+    def snapshot(self):
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'mean': round(self.total / self.count, 3) if self.count else None,
+            'p50': _json_bound(self.quantile(0.50)),
+            'p95': _json_bound(self.quantile(0.95)),
+            'p99': _json_bound(self.quantile(0.99)),
+            'buckets': buckets,
+        }
+
+
+def _json_bound(value):
+    # JSON has no infinity; name the overflow bucket the way the bucket keys do.
+    return '+Inf' if value == float('inf') else value
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.db_queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.view_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.render_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.response_bytes = Histogram(SIZE_BUCKETS_BYTES)
+
+    def snapshot(self):
+        return {
+            'latency_ms': self.latency_ms.snapshot(),
+            'db_ms': self.db_ms.snapshot(),
+            'db_queries': self.db_queries.snapshot(),
+            'view_ms': self.view_ms.snapshot(),
+            'render_ms': self.render_ms.snapshot(),
+            'response_bytes': self.response_bytes.snapshot(),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, sample):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = RouteMetrics()
+            metrics.latency_ms.observe(sample.total_ms)
+            metrics.db_ms.observe(sample.db_ms)
+            metrics.db_queries.observe(sample.queries)
+            metrics.view_ms.observe(sample.view_ms)
+            metrics.render_ms.observe(sample.render_ms)
+            if sample.response_bytes is not None:
+                metrics.response_bytes.observe(sample.response_bytes)
+
+    def snapshot(self):
+        with self._lock:
+            return {route: metrics.snapshot() for route, metrics in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
+
+
+class RequestSample:
+    """
+    Measurements for a single request. Also acts as the
+    ``connection.execute_wrapper`` hook that times every query.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.view_ms = 0.0
+        self.render_ms = 0.0
+        self.total_ms = 0.0
+        self.response_bytes = None
+        self._view_started = None
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def view_started(self):
+        self._view_started = (time.perf_counter(), self.db_ms)
+
+    def view_finished(self):
+        if self._view_started is not None:
+            started, db_ms = self._view_started
+            self.view_ms = (time.perf_counter() - started) * 1000 - (self.db_ms - db_ms)
+            self._view_started = None
+
+    def render_started(self):
+        self._render_started = time.perf_counter()
+
+    def render_finished(self, response):
+        if self._render_started is not None:
+            self.render_ms = (time.perf_counter() - self._render_started) * 1000
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.2f};desc="{self.queries} queries", '
+            f'view;dur={self.view_ms:.2f};desc="outside the database", '
+            f'render;dur={self.render_ms:.2f}, '
+            f'total;dur={self.total_ms:.2f}'
+        )
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, DB time, view time, render time and response size
+    for a sample of requests. Place it first in MIDDLEWARE so the total
+    covers the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+
+        sample = RequestSample()
+        request._metrics_sample = sample
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(sample))
+            response = self.get_response(request)
+        # Responses without a render step (plain HttpResponses) end the view here.
+        sample.view_finished()
+        sample.total_ms = (time.perf_counter() - started) * 1000
+
+        if not response.streaming:
+            sample.response_bytes = len(response.content)
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        registry.record(route, sample)
+
+        if settings.METRICS_SERVER_TIMING_HEADER:
+            response['Server-Timing'] = sample.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        sample = getattr(request, '_metrics_sample', None)
+        if sample is not None:
+            sample.view_started()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step.
+        sample = getattr(request, '_metrics_sample', None)
+        if sample is not None:
+            sample.view_finished()
+            sample.render_started()
+            response.add_post_render_callback(sample.render_finished)
+        return response
+
+
+class MetricsView(APIView):
+    """
+    Admin-only view of the aggregated per-route metrics of this worker process.
+    - get: GET /api/metrics/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'pid': os.getpid(),
+            'sample_rate': settings.METRICS_SAMPLE_RATE,
+            'routes': registry.snapshot(),
+        })
@@ -0,0 +1,52 @@
+"""
+Custom migration operations.
+"""
+from django.db.migrations.operations.base import Operation
+
+
+class AddTrigramIndex(Operation):
+    """
+    Adds a GIN trigram index on UPPER(column::text), the expression PostgreSQL
+    compares for ``icontains`` lookups, so admin search can use it instead of
+    scanning the table. Needs the pg_trgm extension (TrigramExtension).
+    Does nothing on other databases.
+    """
+    reversible = True
+
+    def __init__(self, model_name, field_name, name):
+        self.model_name = model_name
+        self.field_name = field_name
+        self.name = name
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        column = model._meta.get_field(self.field_name).column
+        quote = schema_editor.quote_name
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {quote(self.name)} ON {quote(model._meta.db_table)} "
+            f"USING gin ((UPPER({quote(column)}::text)) gin_trgm_ops)"
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        schema_editor.execute(f"DROP INDEX IF EXISTS {schema_editor.quote_name(self.name)}")
+
+    def describe(self):
+        return f"Add trigram index {self.name} on {self.model_name}.{self.field_name}"
+
+    @property
+    def migration_name_fragment(self):
+        return self.name.lower()
+
+    def deconstruct(self):
+        return self.__class__.__name__, [], {
+            'model_name': self.model_name,
+            'field_name': self.field_name,
+            'name': self.name,
+        }
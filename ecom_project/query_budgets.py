@@ -0,0 +1,74 @@
+"""
+Query and latency budgets for every API route.
+
+``QUERY_BUDGETS`` is the single place where the budgets live. Each entry is
+keyed by (url name, HTTP method) and gives the maximum number of SQL queries
+and a rough wall-clock limit for one request. The tests in each app seed
+realistic data (large catalogs, carts with many lines, users with long order
+histories) and check the routes they cover against this table with
+``QueryBudgetTestCase`` (see ecom_project/testing.py), so an N+1 regression
+fails the suite instead of shipping.
+
+The query limits are tight: each is the largest number of queries any test
+currently sees for that route (savepoints included, since tests run inside a
+transaction). If a change legitimately needs another query, raise the number
+here in the same commit; if it saves one, lower it.
+"""
+from collections import namedtuple
+
+Budget = namedtuple('Budget', ['queries', 'ms'])
+
+QUERY_BUDGETS = {
+    # Authentication
+    ('token_obtain_pair', 'POST'): Budget(queries=11, ms=250),  # includes merging a guest cart
+    ('token_refresh', 'POST'): Budget(queries=2, ms=100),
+    ('token_verify', 'POST'): Budget(queries=1, ms=100),
+
+    # Users
+    ('user-register', 'POST'): Budget(queries=2, ms=250),
+    ('user-profile', 'GET'): Budget(queries=1, ms=100),
+    ('user-profile', 'PATCH'): Budget(queries=2, ms=100),
+    ('user-logout', 'POST'): Budget(queries=8, ms=100),
+
+    # Public catalog
+    ('public-product-list', 'GET'): Budget(queries=3, ms=150),
+    ('public-product-detail', 'GET'): Budget(queries=1, ms=100),
+
+    # Catalog administration
+    ('admin-category-list', 'GET'): Budget(queries=3, ms=150),
+    ('admin-category-list', 'POST'): Budget(queries=3, ms=100),
+    ('admin-category-detail', 'GET'): Budget(queries=2, ms=100),
+    ('admin-category-detail', 'PATCH'): Budget(queries=4, ms=100),
+    ('admin-product-list', 'GET'): Budget(queries=3, ms=150),
+    ('admin-product-list', 'POST'): Budget(queries=5, ms=100),
+    ('admin-product-detail', 'GET'): Budget(queries=2, ms=100),
+    ('admin-product-detail', 'PATCH'): Budget(queries=5, ms=100),
+    ('admin-product-detail', 'DELETE'): Budget(queries=9, ms=100),
+
+    # Cart
+    ('cart-list', 'GET'): Budget(queries=4, ms=150),
+    ('cart-list', 'POST'): Budget(queries=15, ms=150),
+    ('cart-detail', 'PATCH'): Budget(queries=10, ms=150),
+    ('cart-detail', 'DELETE'): Budget(queries=4, ms=100),
+
+    # Orders
+    ('order-create', 'POST'): Budget(queries=17, ms=300),
+    ('order-list', 'GET'): Budget(queries=6, ms=200),
+    ('order-detail', 'GET'): Budget(queries=5, ms=100),
+    ('order-cancel', 'POST'): Budget(queries=13, ms=150),
+    ('order-summary', 'GET'): Budget(queries=3, ms=100),
+    ('order-archived', 'GET'): Budget(queries=5, ms=200),
+
+    # Reports
+    ('sales-report', 'GET'): Budget(queries=3, ms=150),
+
+    # Operations
+    ('metrics', 'GET'): Budget(queries=1, ms=100),
+    # A typical page load: profile, cart, order list and four products, authenticated once.
+    ('batch', 'POST'): Budget(queries=13, ms=400),
+}
+
+# Routes that are deliberately left out of the table above.
+UNBUDGETED_ROUTES = {
+    'api-root',  # DRF's browsable router index
+}
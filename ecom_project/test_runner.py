@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class PrimaryReadsTestRunner(DiscoverRunner):
+    """
+    Runs the suite with every read on the primary. A configured replica is a test
+    mirror: a second connection that cannot see the data a test writes inside its
+    transaction. Tests of the routing itself opt back in with
+    ``override_settings(DATABASE_REPLICA_READS=True)``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._primary_reads = override_settings(DATABASE_REPLICA_READS=False)
+        self._primary_reads.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._primary_reads.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,137 @@
+"""
+Test harness shared by the apps' test suites: seed data factories and
+``QueryBudgetTestCase``, which checks requests against ``QUERY_BUDGETS``.
+Only imported by tests.
+"""
+import time
+from contextlib import ExitStack
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from carts.models import Cart, CartItem, Order, OrderItem
+from products import snapshots
+from products.listings import refresh_listings
+from products.models import Category, Product
+from users.models import User
+
+from .query_budgets import QUERY_BUDGETS
+
+def create_user(email, is_staff=False, password='Secret123!'):
+    if is_staff:
+        return User.objects.create_superuser(email=email, password=password, name='Admin', phone='1234567890')
+    return User.objects.create_user(email=email, password=password, name='Test User', phone='1234567890')
+
+
+def create_catalog(categories=10, products_per_category=50, stock=1000):
+    """
+    Bulk-creates a catalog, builds its read model and returns its products ordered by id.
+    """
+    Category.objects.bulk_create([
+        Category(name=f"Category {i}", description=f"Category number {i}") for i in range(categories)
+    ])
+    Product.objects.bulk_create([
+        Product(
+            name=f"{category.name} product {i}",
+            description="A realistic, fairly long product description. " * 20,
+            price=Decimal('9.99') + i,
+            stock=stock,
+            category=category,
+        )
+        for category in Category.objects.all()
+        for i in range(products_per_category)
+    ])
+    refresh_listings()
+    return list(Product.objects.order_by('id'))
+
+
+def fill_cart(user, products, quantity=1):
+    cart, _ = Cart.objects.get_or_create(user=user)
+    CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=quantity) for product in products])
+    return cart
+
+
+def create_order_history(user, products, orders=50, items_per_order=5):
+    """
+    Bulk-creates ``orders`` pending orders for the user, cycling through the given products.
+    """
+    created = Order.objects.bulk_create([
+        Order(user=user, total_price=Decimal('0.00')) for _ in range(orders)
+    ])
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product=products[(n * items_per_order + i) % len(products)],
+            quantity=1,
+            price=products[(n * items_per_order + i) % len(products)].price,
+        )
+        for n, order in enumerate(created)
+        for i in range(items_per_order)
+    ])
+    return created
+
+
+# Fast hashing keeps the timing budgets about our code, not PBKDF2.
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTestCase(APITestCase):
+    """
+    Base class for API tests that check requests against ``QUERY_BUDGETS``.
+    """
+
+    def setUp(self):
+        # Cached data (product snapshots, guest carts, idempotency keys) would
+        # otherwise outlive the database rollback between tests.
+        cache.clear()
+        snapshots.local_cache.clear()
+
+    def authenticate(self, user):
+        # A real JWT, so the authentication query is part of what gets measured.
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def assertWithinBudget(self, route, method, url_kwargs=None, data=None, query_params=None, headers=None):
+        """
+        Sends one request to the named route and fails if it runs more queries,
+        or takes longer, than its budget allows. Returns the response.
+        """
+        budget = QUERY_BUDGETS[(route, method)]
+        url = reverse(route, kwargs=url_kwargs)
+        send = getattr(self.client, method.lower())
+
+        with ExitStack() as stack:
+            # Only the databases the test may use: touching any other one is an error in a TestCase.
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in self.databases]
+            started = time.perf_counter()
+            if method == 'GET':
+                response = send(url, query_params, headers=headers)
+            else:
+                response = send(url, data, format='json', headers=headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        queries = [query['sql'] for context in captured for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget.queries,
+            f"{method} {route} ran {len(queries)} queries (budget {budget.queries}):\n" + "\n".join(queries)
+        )
+        self.assertLessEqual(
+            elapsed_ms, budget.ms,
+            f"{method} {route} took {elapsed_ms:.1f} ms (budget {budget.ms} ms)"
+        )
+        return response
+
+    def assertPageQueries(self, url, max_queries, params=None):
+        """
+        Loads a page that is not an API route (e.g. a Django admin page) and fails
+        if it runs more than ``max_queries`` queries. Returns the response.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(captured), max_queries, "\n".join(query['sql'] for query in captured))
+        return response
@@ -0,0 +1,374 @@
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection, connections
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.test import APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ecom_project.admin_tools import EstimatedCountPaginator, estimated_row_count
+from ecom_project.db_routers import (
+    PRIMARY_DB_ALIAS, REPLICA_DB_ALIAS, _read_db_alias, is_pinned_to_primary,
+)
+from ecom_project.metrics import Histogram, registry
+from ecom_project.query_budgets import QUERY_BUDGETS, UNBUDGETED_ROUTES
+from ecom_project.testing import (
+    QueryBudgetTestCase, create_catalog, create_order_history, create_user, fill_cart,
+)
+from ecom_project.throttling import CatalogThrottle
+from products import snapshots
+from products.models import Product
+
+
+def _route_names(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            # The Django admin site has its own namespace and is not part of the API.
+            if pattern.namespace == 'admin':
+                continue
+            yield from _route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield pattern.name
+
+
+class QueryBudgetTableTests(QueryBudgetTestCase):
+    def test_every_route_has_a_budget(self):
+        budgeted = {route for route, method in QUERY_BUDGETS}
+        missing = set(_route_names(get_resolver().url_patterns)) - budgeted - UNBUDGETED_ROUTES
+        self.assertEqual(missing, set(), "Add these routes to QUERY_BUDGETS")
+
+    def test_metrics(self):
+        self.authenticate(create_user('admin@example.com', is_staff=True))
+        response = self.assertWithinBudget('metrics', 'GET')
+        self.assertEqual(response.status_code, 200)
+
+
+class HistogramTests(SimpleTestCase):
+    def test_quantiles_are_bucket_upper_bounds(self):
+        histogram = Histogram((1, 10, 100))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in (0.5, 5, 5, 50):
+            histogram.observe(value)
+        self.assertEqual((histogram.quantile(0.25), histogram.quantile(0.5), histogram.quantile(0.99)), (1, 10, 100))
+        histogram.observe(1000)
+        self.assertEqual(histogram.quantile(0.99), float('inf'))
+        snapshot = histogram.snapshot()
+        self.assertEqual((snapshot['count'], snapshot['p99']), (5, '+Inf'))
+        self.assertEqual(snapshot['buckets'], {'1': 1, '10': 2, '100': 1, '+Inf': 1})
+
+
+class RequestMetricsTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, products_per_category=5)
+        cls.user = create_user('shopper@example.com')
+        fill_cart(cls.user, cls.products)
+
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def test_requests_are_recorded_per_route(self):
+        self.authenticate(self.user)
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse('cart-list')).status_code, 200)
+        self.client.get(reverse('public-product-list'))
+
+        routes = registry.snapshot()
+        self.assertEqual(set(routes), {'cart-list', 'public-product-list'})
+        cart = routes['cart-list']
+        self.assertEqual(cart['latency_ms']['count'], 2)
+        self.assertGreater(cart['db_queries']['sum'], 0)
+        self.assertGreater(cart['view_ms']['sum'], 0)
+        self.assertGreater(cart['render_ms']['sum'], 0)
+        self.assertGreater(cart['response_bytes']['sum'], 0)
+        # The product list is a plain HttpResponse: the view is timed, nothing is rendered.
+        self.assertGreater(routes['public-product-list']['view_ms']['sum'], 0)
+        self.assertEqual(routes['public-product-list']['render_ms']['sum'], 0)
+
+    def test_server_timing_header_is_opt_in(self):
+        self.authenticate(self.user)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('cart-list')))
+        with override_settings(METRICS_SERVER_TIMING_HEADER=True):
+            header = self.client.get(reverse('cart-list'))['Server-Timing']
+        self.assertEqual([entry.split(';')[0] for entry in header.split(', ')], ['db', 'view', 'render', 'total'])
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_recorded(self):
+        self.client.get(reverse('public-product-list'))
+        self.assertEqual(registry.snapshot(), {})
+
+    def test_metrics_are_admin_only(self):
+        self.client.get(reverse('public-product-list'))
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.authenticate(create_user('admin@example.com', is_staff=True))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public-product-list', response.data['routes'])
+
+
+class AdminToolsTests(QueryBudgetTestCase):
+    def test_paginator_counts_exactly_without_planner_estimates(self):
+        create_catalog(categories=2, products_per_category=10)
+        paginator = EstimatedCountPaginator(Product.objects.order_by('id'), 5)
+        self.assertEqual(paginator.count, 20)
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(estimated_row_count(Product))
+
+
+def _throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottleTests(QueryBudgetTestCase):
+    def test_catalog_is_rate_limited_per_ip_without_queries(self):
+        with _throttle_rates(catalog='2/hour'):
+            for _ in range(2):
+                self.assertNotEqual(self.client.get(reverse('public-product-list')).status_code, 429)
+            # A bogus token shows that rejected requests are not even authenticated.
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.get(reverse('public-product-list'), HTTP_AUTHORIZATION='Bearer bogus')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(len(captured), 0)
+            self.assertTrue(0 < int(response['Retry-After']) <= 3600)
+
+            # Other clients and other scopes have their own counters.
+            self.assertNotEqual(self.client.get(reverse('public-product-list'), REMOTE_ADDR='10.0.0.2').status_code, 429)
+            self.assertNotEqual(self.client.post(reverse('token_obtain_pair'), {}).status_code, 429)
+
+    def test_login_is_rate_limited(self):
+        create_user('victim@example.com')
+        with _throttle_rates(login='3/hour'):
+            statuses = [
+                self.client.post(reverse('token_obtain_pair'), {'email': 'victim@example.com', 'password': 'guess'}).status_code
+                for _ in range(5)
+            ]
+        self.assertEqual(statuses, [401, 401, 401, 429, 429])
+
+    def test_forwarded_for_does_not_reset_the_counter(self):
+        with _throttle_rates(login='3/hour'):
+            statuses = [
+                self.client.post(
+                    reverse('token_obtain_pair'), {'email': 'victim@example.com', 'password': 'guess'},
+                    HTTP_X_FORWARDED_FOR=f'203.0.113.{i}',
+                ).status_code
+                for i in range(5)
+            ]
+        self.assertEqual(statuses, [401, 401, 401, 429, 429])
+
+    def test_forwarded_for_is_read_behind_the_configured_proxies(self):
+        with override_settings(REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1, 'DEFAULT_THROTTLE_RATES': {'login': '1/hour'},
+        }):
+            for i in range(2):
+                response = self.client.post(reverse('token_obtain_pair'), {}, HTTP_X_FORWARDED_FOR=f'10.0.0.1, 203.0.113.{i}')
+                self.assertNotEqual(response.status_code, 429)
+            # The spoofable first entry is ignored: only the address the proxy saw counts.
+            response = self.client.post(reverse('token_obtain_pair'), {}, HTTP_X_FORWARDED_FOR='10.0.0.2, 203.0.113.0')
+            self.assertEqual(response.status_code, 429)
+
+    def test_redis_counter_is_one_pipeline(self):
+        class Pipeline:
+            def __init__(self, commands):
+                self.commands = commands
+
+            def incr(self, key):
+                self.commands.append(('INCR', key))
+
+            def expire(self, key, timeout):
+                self.commands.append(('EXPIRE', key, timeout))
+
+            def execute(self):
+                executed.append(list(self.commands))
+                self.commands.clear()
+                return [len(executed), True]
+
+        executed = []
+        redis = RedisCache('redis://127.0.0.1:6379/1', {})
+        redis.__dict__['_cache'] = mock.Mock(**{'get_client.return_value.pipeline.side_effect': lambda: Pipeline([])})
+        throttle = CatalogThrottle()
+        throttle.duration = 60
+        with mock.patch.object(CatalogThrottle, 'cache', redis):
+            self.assertEqual(throttle.increment('throttle:test'), 1)
+            self.assertEqual(throttle.increment('throttle:test'), 2)
+        self.assertEqual(executed[0], [('INCR', ':1:throttle:test'), ('EXPIRE', ':1:throttle:test', 61)])
+        self.assertEqual(len(executed), 2)
+
+    def test_scopes_without_a_rate_are_not_throttled(self):
+        with _throttle_rates():
+            for _ in range(5):
+                self.assertNotEqual(self.client.get(reverse('public-product-list')).status_code, 429)
+
+
+class BatchTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=2, products_per_category=10)
+        cls.user = create_user('shopper@example.com')
+        fill_cart(cls.user, cls.products[:5])
+        create_order_history(cls.user, cls.products, orders=10)
+
+    def test_page_load(self):
+        self.authenticate(self.user)
+        requests = [
+            {'method': 'GET', 'path': '/api/users/profile/'},
+            {'method': 'GET', 'path': '/api/cart/'},
+            {'method': 'GET', 'path': '/api/orders/?page=1'},
+        ] + [{'method': 'GET', 'path': f'/api/products/{product.id}/'} for product in self.products[:4]]
+        response = self.assertWithinBudget('batch', 'POST', data={'requests': requests})
+        self.assertEqual(response.status_code, 200)
+        responses = response.data['responses']
+        self.assertEqual([entry['status'] for entry in responses], [200] * 7)
+        self.assertEqual(responses[0]['body']['email'], 'shopper@example.com')
+        self.assertEqual(len(responses[1]['body']['items']), 5)
+        self.assertEqual(responses[3]['body']['id'], self.products[0].id)
+        self.assertIn('ETag', responses[3]['headers'])
+
+    def test_sub_requests_keep_their_own_permissions_and_errors(self):
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'method': 'POST', 'path': '/api/cart/', 'body': {'product_id': self.products[0].id, 'quantity': 2}},
+            {'method': 'GET', 'path': '/api/users/profile/'},
+            {'method': 'DELETE', 'path': f'/api/admin/products/{self.products[0].id}/'},
+            {'method': 'GET', 'path': '/api/products/999999/'},
+            {'method': 'GET', 'path': '/api/nothing-here/'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['status'] for entry in response.data['responses']], [201, 401, 401, 404, 404])
+        self.assertIn('X-Cart-Token', response.data['responses'][0]['headers'])
+        self.assertTrue(Product.objects.filter(id=self.products[0].id).exists())
+
+    def test_a_failing_sub_request_does_not_fail_the_batch(self):
+        self.authenticate(self.user)
+        requests = [
+            {'method': 'GET', 'path': '/api/cart/'},
+            {'method': 'GET', 'path': '/api/users/profile/'},
+            {'method': 'GET', 'path': f'/api/products/{self.products[0].id}/'},
+        ]
+        with mock.patch('users.views.UserProfileView.get_object', side_effect=RuntimeError("boom")):
+            with self.assertLogs('ecom_project.batch', 'ERROR'):
+                response = self.client.post(reverse('batch'), {'requests': requests}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry['status'] for entry in response.data['responses']], [200, 500, 200])
+
+    def test_sub_requests_can_set_the_headers_the_api_reads(self):
+        product = self.products[0]
+        etag = self.client.get(reverse('public-product-detail', args=[product.id]))['ETag']
+        response = self.client.post(reverse('batch'), {'requests': [
+            {'method': 'GET', 'path': f'/api/products/{product.id}/', 'headers': {'If-None-Match': etag}},
+        ]}, format='json')
+        self.assertEqual(response.data['responses'][0]['status'], 304)
+
+    def test_invalid_batches(self):
+        for requests in (
+            [],
+            [{'method': 'GET', 'path': '/api/products/', 'headers': {'X-Forwarded-For': '203.0.113.9'}}],
+            [{'method': 'GET', 'path': '/api/products/', 'headers': {'Host': 'evil.example.com'}}],
+            [{'method': 'GET', 'path': '/admin/'}],
+            [{'method': 'POST', 'path': '/api/batch/', 'body': {'requests': []}}],
+            [{'method': 'GET', 'path': '/api/products/'}] * (settings.BATCH_MAX_REQUESTS + 1),
+        ):
+            response = self.client.post(reverse('batch'), {'requests': requests}, format='json')
+            self.assertEqual(response.status_code, 400, requests)
+
+
+def _sticky_window_passed():
+    # Moves the cache's clock past the sticky window.
+    return mock.patch('time.time', return_value=time.time() + settings.REPLICA_STICKY_SECONDS + 1)
+
+
+class DatabaseRoutingTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, products_per_category=5)
+        cls.user = create_user('shopper@example.com')
+
+    def test_a_write_pins_the_user_for_the_sticky_window(self):
+        self.authenticate(self.user)
+        self.assertFalse(is_pinned_to_primary(self.user))
+        response = self.client.post(reverse('cart-list'), {'product_id': self.products[0].id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(is_pinned_to_primary(self.user))
+        with _sticky_window_passed():
+            self.assertFalse(is_pinned_to_primary(self.user))
+
+    def test_failed_writes_and_reads_do_not_pin(self):
+        self.authenticate(self.user)
+        response = self.client.post(reverse('cart-list'), {'product_id': 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.client.get(reverse('cart-list'))
+        self.assertFalse(is_pinned_to_primary(self.user))
+
+    def test_the_read_alias_does_not_outlive_a_failed_request(self):
+        self.client.raise_request_exception = False
+        with mock.patch('ecom_project.db_routers.replica_configured', return_value=True), \
+                mock.patch('products.views.ProductDetailView.get_object', side_effect=RuntimeError("boom")):
+            response = self.client.get(reverse('public-product-detail', args=[self.products[0].id]))
+        self.assertEqual(response.status_code, 500)
+        self.assertIsNone(_read_db_alias.get())
+
+
+REPLICA_IN_SETTINGS = REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@skipUnless(REPLICA_IN_SETTINGS, "Set DATABASE_REPLICA_URL to test routing to the replica.")
+@override_settings(
+    DATABASE_REPLICA_READS=True, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    The replica is a test mirror of the primary: a second connection to the same
+    database, which only sees committed rows, hence a TransactionTestCase. The
+    test runner keeps replica reads off for every other test.
+    """
+    # The test runner sets up every alias named here, even for skipped classes.
+    databases = {PRIMARY_DB_ALIAS, REPLICA_DB_ALIAS} if REPLICA_IN_SETTINGS else {PRIMARY_DB_ALIAS}
+
+    def setUp(self):
+        cache.clear()
+        snapshots.local_cache.clear()
+        self.products = create_catalog(categories=1, products_per_category=5)
+        self.user = create_user('shopper@example.com')
+        create_order_history(self.user, self.products, orders=2)
+
+    def authenticate(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def assertReadsFrom(self, alias, url):
+        """
+        Requests ``url`` and checks which database its view read from. Authentication
+        runs before the view picks a database, so loading the user always hits the primary.
+        """
+        with CaptureQueriesContext(connections[PRIMARY_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[REPLICA_DB_ALIAS]) as replica:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content)
+        if alias == REPLICA_DB_ALIAS:
+            self.assertGreater(len(replica), 0)
+            self.assertEqual(
+                [query['sql'] for query in primary if 'FROM "users_user"' not in query['sql']], []
+            )
+        else:
+            self.assertEqual(len(replica), 0)
+            self.assertGreater(len(primary), 0)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertReadsFrom(REPLICA_DB_ALIAS, reverse('public-product-list'))
+        self.authenticate(self.user)
+        self.assertReadsFrom(REPLICA_DB_ALIAS, reverse('order-list'))
+
+    def test_writes_pin_the_user_to_the_primary_until_the_window_passes(self):
+        self.authenticate(self.user)
+        response = self.client.post(reverse('cart-list'), {'product_id': self.products[0].id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertReadsFrom(PRIMARY_DB_ALIAS, reverse('order-list'))
+        with _sticky_window_passed():
+            self.assertReadsFrom(REPLICA_DB_ALIAS, reverse('order-list'))
@@ -0,0 +1,119 @@
+"""
+Rate limiting for the public and authentication endpoints.
+
+DRF's ``SimpleRateThrottle`` keeps a list of request timestamps per client in
+the cache and rewrites it on every request: a get and a set that race with
+each other under concurrent requests, with a value that grows with the rate.
+``CacheCounterThrottle`` instead keeps one integer counter per client per
+fixed window and bumps it atomically, and never touches the database. On
+Redis the bump is an ``INCR`` + ``EXPIRE`` pipeline, one round trip per
+check; Django's ``RedisCache.incr`` would send ``EXISTS`` and ``INCR``
+separately. Other backends use the cache's ``incr`` (one round trip on
+memcached, two on the first request of a window). Aligned windows allow a
+burst of up to twice the rate across a window boundary, which is acceptable
+for abuse protection.
+
+The counters live in the default cache, so they are only shared between
+worker processes when that is a shared cache (``CACHE_URL=redis://...``);
+with the default in-memory cache each process counts on its own.
+
+Rates are configured per scope in ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']``;
+a scope without a rate is not throttled. Views that use these throttles
+should also mix in ``ThrottleFirstMixin`` so rejected requests are turned
+away before authentication, permission checks and queryset work.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class CacheCounterThrottle(SimpleRateThrottle):
+    """
+    A fixed-window counter per client IP address. Subclasses set ``scope``.
+    """
+    cache_alias = 'default'
+    cache_format = 'throttle:%(scope)s:%(ident)s:%(window)d'
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_rate(self):
+        # Read the rates on every instantiation (not once at import time, as
+        # SimpleRateThrottle does) so overridden settings take effect.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_cache_key(self, request, view):
+        # Keyed by IP address only: looking at request.user would authenticate the request first.
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request), 'window': self.window}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.now = self.timer()
+        self.window = int(self.now // self.duration)
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        return self.increment(self.key) <= self.num_requests
+
+    def increment(self, key):
+        """
+        Adds one to the window's counter and returns the new count.
+        """
+        # Keep the counter a little past the window's end, so a slow clock on
+        # another worker still finds it.
+        timeout = self.duration + 1
+        cache = self.cache
+        if isinstance(cache, RedisCache):
+            key = cache.make_and_validate_key(key)
+            # The key is specific to the window, so refreshing its expiry on every hit is harmless.
+            pipeline = cache._cache.get_client(key, write=True).pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, timeout)
+            count, _ = pipeline.execute()
+            return count
+
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # First request of the window.
+            if cache.add(key, 1, timeout):
+                return 1
+            return cache.incr(key)
+
+    def wait(self):
+        return (self.window + 1) * self.duration - self.now
+
+
+class CatalogThrottle(CacheCounterThrottle):
+    scope = 'catalog'
+
+
+class LoginThrottle(CacheCounterThrottle):
+    scope = 'login'
+
+
+class RegistrationThrottle(CacheCounterThrottle):
+    scope = 'register'
+
+
+class ThrottleFirstMixin:
+    """
+    View mixin that checks the throttles before authentication instead of
+    after it, so a throttled request costs one cache round trip and nothing else.
+    Only use it with throttles that do not look at ``request.user``.
+    """
+    _throttles_checked = False
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self._throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not self._throttles_checked:
+            super().check_throttles(request)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.queue import process_batch
+
+
+class Command(BaseCommand):
+    help = "Runs queued background tasks from the outbox table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when there is nothing to do.")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain the currently due tasks and exit instead of polling forever.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_batch(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            total += processed
+            if processed:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} task(s)."))
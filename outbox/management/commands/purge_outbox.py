@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from outbox.queue import purge_cutoff, purge_done
+
+
+class Command(BaseCommand):
+    help = ("Deletes outbox tasks that finished before the cutoff in batches. Failed tasks are kept. "
+            "Run it periodically (e.g. nightly from cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Delete tasks done more than this many days ago. Defaults to OUTBOX_RETENTION_DAYS.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] is not None and options['older_than_days'] < 0:
+            raise CommandError("--older-than-days must not be negative.")
+
+        cutoff = purge_cutoff(options['older_than_days'])
+        purged = purge_done(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} task(s) done before {cutoff:%Y-%m-%d %H:%M}."))
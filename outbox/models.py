@@ -0,0 +1,30 @@
+from django.db import models
+from django.utils import timezone
+
+# A unit of background work, written in the same transaction as the change that caused it
+# and executed later by the process_outbox worker.
+class OutboxTask(models.Model):
+    class TaskStatus(models.TextChoices):
+        PENDING = 'P', 'Pending'
+        RUNNING = 'R', 'Running'
+        DONE = 'D', 'Done'
+        FAILED = 'F', 'Failed'
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=1, choices=TaskStatus.choices, default=TaskStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls for PENDING tasks, and RUNNING tasks whose lease has
+            # expired, by available_at.
+            models.Index(fields=['status', 'available_at'], name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} task {self.id} ({self.get_status_display()})"
@@ -0,0 +1,154 @@
+"""
+A small database-backed task queue built on the transactional outbox pattern.
+
+``enqueue`` inserts an ``OutboxTask`` row using the caller's transaction, so a
+task exists if and only if the change that produced it was committed. The
+``process_outbox`` management command drains pending tasks in batches and
+retries failures with exponential backoff. Tasks run at least once: each
+handler commits together with its task's DONE mark, but a worker that dies
+mid-task leaves it to be run again once its lease expires. ``purge_outbox``
+deletes old finished tasks so the table stays small.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxTask
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+class Defer(Exception):
+    """
+    Raised by a handler that cannot run yet (e.g. it must wait for another task).
+    The task is run again after ``seconds``; deferring does not use up an attempt.
+    """
+
+    def __init__(self, reason, seconds=5):
+        super().__init__(reason)
+        self.seconds = seconds
+
+
+def register(topic):
+    """
+    Decorator that registers a function as the handler for a topic.
+    The handler is called with the task's payload dict.
+    """
+    def decorator(func):
+        _handlers[topic] = func
+        return func
+    return decorator
+
+
+def enqueue(topic, **payload):
+    """
+    Queues a task. Call it inside the transaction that makes the related change.
+    """
+    return OutboxTask.objects.create(topic=topic, payload=payload)
+
+
+def process_batch(batch_size=100, max_attempts=None):
+    """
+    Runs up to ``batch_size`` due tasks and returns how many were processed.
+    Rows are claimed with SKIP LOCKED so several workers can run side by side.
+    """
+    if max_attempts is None:
+        max_attempts = settings.OUTBOX_MAX_ATTEMPTS
+
+    tasks = _claim(batch_size)
+    for task in tasks:
+        _run(task, max_attempts)
+    return len(tasks)
+
+
+def _claim(batch_size):
+    """
+    Marks up to ``batch_size`` due tasks as running and commits, so no row lock is
+    held while the handlers run. A claim is a lease: a task whose worker died
+    before finishing it becomes due again when the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            OutboxTask.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboxTask.TaskStatus.PENDING, OutboxTask.TaskStatus.RUNNING],
+                available_at__lte=now,
+            )
+            .order_by('id')[:batch_size]
+        )
+        for task in tasks:
+            task.status = OutboxTask.TaskStatus.RUNNING
+            task.attempts += 1
+            task.available_at = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+        OutboxTask.objects.bulk_update(tasks, ['status', 'attempts', 'available_at'])
+    return tasks
+
+
+def _finish(task, **fields):
+    # Only the worker holding the current lease may record the outcome: the
+    # attempt count changes whenever a task with an expired lease is claimed again.
+    return OutboxTask.objects.filter(
+        id=task.id, status=OutboxTask.TaskStatus.RUNNING, attempts=task.attempts
+    ).update(**fields)
+
+
+def _run(task, max_attempts):
+    try:
+        handler = _handlers[task.topic]
+        # The handler's writes and the task's DONE mark commit together.
+        with transaction.atomic():
+            handler(task.payload)
+            if not _finish(task, status=OutboxTask.TaskStatus.DONE, last_error='', processed_at=timezone.now()):
+                logger.warning("Outbox task %s (%s) lost its lease; discarding its result", task.id, task.topic)
+                transaction.set_rollback(True)
+        return
+    except Defer as e:
+        logger.info("Outbox task %s (%s) deferred: %s", task.id, task.topic, e)
+        _finish(
+            task,
+            status=OutboxTask.TaskStatus.PENDING,
+            attempts=task.attempts - 1,
+            available_at=timezone.now() + timedelta(seconds=e.seconds),
+        )
+        return
+    except Exception as e:
+        logger.exception("Outbox task %s (%s) failed", task.id, task.topic)
+        last_error = repr(e)
+
+    if task.attempts >= max_attempts:
+        _finish(task, status=OutboxTask.TaskStatus.FAILED, last_error=last_error)
+    else:
+        _finish(
+            task,
+            status=OutboxTask.TaskStatus.PENDING,
+            last_error=last_error,
+            available_at=timezone.now() + timedelta(seconds=2 ** task.attempts),
+        )
+
+
+def purge_cutoff(days=None):
+    if days is None:
+        days = settings.OUTBOX_RETENTION_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def purge_done(cutoff, batch_size=1000):
+    """
+    Deletes tasks that were done before ``cutoff`` in batches and returns how many
+    were removed. Failed tasks are kept for inspection.
+    """
+    purged = 0
+    while True:
+        ids = list(
+            OutboxTask.objects.filter(status=OutboxTask.TaskStatus.DONE, processed_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return purged
+        purged += OutboxTask.objects.filter(id__in=ids).delete()[0]
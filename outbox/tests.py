@@ -0,0 +1,127 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from outbox.models import OutboxTask
+from outbox.queue import Defer, _claim, _run, enqueue, process_batch, register
+
+calls = []
+
+
+@register('test.succeed')
+def succeed(payload):
+    calls.append(payload)
+    enqueue('test.follow-up', parent=payload['n'])
+
+
+@register('test.fail')
+def fail(payload):
+    enqueue('test.follow-up', parent=payload['n'])
+    raise RuntimeError("boom")
+
+
+@register('test.defer')
+def defer(payload):
+    raise Defer("not yet", seconds=30)
+
+
+@override_settings(OUTBOX_MAX_ATTEMPTS=3, OUTBOX_LEASE_SECONDS=60)
+class ProcessBatchTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def make_due(self, task):
+        OutboxTask.objects.filter(id=task.id).update(available_at=timezone.now())
+
+    def test_handler_and_done_mark_commit_together(self):
+        task = enqueue('test.succeed', n=1)
+        self.assertEqual(process_batch(), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.last_error), (OutboxTask.TaskStatus.DONE, 1, ''))
+        self.assertIsNotNone(task.processed_at)
+        self.assertEqual(calls, [{'n': 1}])
+        self.assertTrue(OutboxTask.objects.filter(topic='test.follow-up', payload={'parent': 1}).exists())
+
+    def test_failures_are_retried_with_backoff_then_marked_failed(self):
+        task = enqueue('test.fail', n=1)
+        with self.assertLogs('outbox.queue', 'ERROR'):
+            process_batch()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (OutboxTask.TaskStatus.PENDING, 1))
+        self.assertIn("boom", task.last_error)
+        self.assertAlmostEqual(
+            (task.available_at - timezone.now()).total_seconds(), 2, delta=1
+        )
+        # The failed attempt's writes were rolled back, and the task is not due yet.
+        self.assertFalse(OutboxTask.objects.filter(topic='test.follow-up').exists())
+        self.assertEqual(process_batch(), 0)
+
+        self.make_due(task)
+        with self.assertLogs('outbox.queue', 'ERROR'):
+            process_batch()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (OutboxTask.TaskStatus.PENDING, 2))
+        self.assertAlmostEqual(
+            (task.available_at - timezone.now()).total_seconds(), 4, delta=1
+        )
+
+        self.make_due(task)
+        with self.assertLogs('outbox.queue', 'ERROR'):
+            process_batch()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (OutboxTask.TaskStatus.FAILED, 3))
+        self.make_due(task)
+        self.assertEqual(process_batch(), 0)
+
+    def test_deferring_does_not_use_up_attempts(self):
+        task = enqueue('test.defer')
+        for _ in range(5):
+            self.make_due(task)
+            process_batch()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.last_error), (OutboxTask.TaskStatus.PENDING, 0, ''))
+        self.assertAlmostEqual((task.available_at - timezone.now()).total_seconds(), 30, delta=1)
+
+    def test_unknown_topics_fail_like_any_handler(self):
+        task = enqueue('test.unregistered')
+        with self.assertLogs('outbox.queue', 'ERROR'):
+            process_batch(max_attempts=1)
+        task.refresh_from_db()
+        self.assertEqual(task.status, OutboxTask.TaskStatus.FAILED)
+        self.assertIn("KeyError", task.last_error)
+
+    def test_a_claim_is_a_lease(self):
+        task = enqueue('test.succeed', n=1)
+        [claimed] = _claim(batch_size=10)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (OutboxTask.TaskStatus.RUNNING, 1))
+        self.assertEqual(process_batch(), 0)
+
+        # The first worker died; once the lease runs out another one runs the task.
+        self.make_due(task)
+        self.assertEqual(process_batch(), 1)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (OutboxTask.TaskStatus.DONE, 2))
+
+        # A worker that finishes after losing its lease does not commit its result.
+        with self.assertLogs('outbox.queue', 'WARNING'):
+            _run(claimed, max_attempts=3)
+        self.assertEqual(calls, [{'n': 1}, {'n': 1}])
+        self.assertEqual(OutboxTask.objects.filter(topic='test.follow-up').count(), 1)
+
+
+class PurgeOutboxTests(TestCase):
+    def test_purges_old_done_tasks_only(self):
+        now = timezone.now()
+        _, recent, failed = OutboxTask.objects.bulk_create([
+            OutboxTask(topic='test.old', status=OutboxTask.TaskStatus.DONE, processed_at=now - datetime.timedelta(days=10)),
+            OutboxTask(topic='test.recent', status=OutboxTask.TaskStatus.DONE, processed_at=now - datetime.timedelta(days=1)),
+            OutboxTask(topic='test.failed', status=OutboxTask.TaskStatus.FAILED, created_at=now - datetime.timedelta(days=10)),
+        ])
+        out = StringIO()
+        call_command('purge_outbox', older_than_days=7, batch_size=1, stdout=out)
+        self.assertIn("Purged 1 task(s)", out.getvalue())
+        self.assertEqual(set(OutboxTask.objects.values_list('id', flat=True)), {recent.id, failed.id})
@@ -1,6 +1,23 @@
 from django.contrib import admin
+
+from ecom_project.admin_tools import LargeTableAdmin
 from .models import Category, Product
 
-# Register your models here.
-admin.site.register(Category)
-admin.site.register(Product)
\ No newline at end of file
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+    ordering = ('name',)
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'category', 'price', 'stock', 'updated_at')
+    list_select_related = ('category',)
+    list_filter = ('category',)
+    # Trigram-indexed on PostgreSQL (products/migrations/0003_trigram_search.py).
+    search_fields = ('name',)
+    autocomplete_fields = ('category',)
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-id',)
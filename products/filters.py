@@ -1,18 +1,19 @@
 import django_filters
-from .models import Product
+from .models import ProductListing
 
-class ProductFilter(django_filters.FilterSet):
+# Public catalog filters, applied to the denormalized ProductListing read model.
+class ProductListingFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr='gte')
     max_price = django_filters.NumberFilter(field_name="price", lookup_expr='lte')
-    category = django_filters.CharFilter(field_name='category__name', lookup_expr='iexact')
+    category = django_filters.CharFilter(field_name='category_name', lookup_expr='iexact')
     in_stock = django_filters.BooleanFilter(method='filter_in_stock')
 
     class Meta:
-        model = Product
+        model = ProductListing
         fields = ['category', 'min_price', 'max_price', 'in_stock']
 
     def filter_in_stock(self, queryset, name, value):
         if value:
             return queryset.filter(stock__gt=0)
         else:
-            return queryset.filter(stock=0)
\ No newline at end of file
+            return queryset.filter(stock=0)
@@ -0,0 +1,70 @@
+"""
+Maintenance and rendering of the ``ProductListing`` read model.
+
+Each listing stores the product exactly as ``ProductSerializer`` renders it,
+so the public catalog endpoints can answer by joining stored JSON fragments
+instead of serializing model instances on every request.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+
+from .models import Product, ProductListing
+from .serializers import ProductSerializer
+
+LISTING_FIELDS = ['category_name', 'price', 'stock', 'updated_at', 'data']
+
+
+def _build_listing(product):
+    return ProductListing(
+        product=product,
+        category_name=product.category.name,
+        price=product.price,
+        stock=product.stock,
+        updated_at=product.updated_at,
+        data=JSONRenderer().render(ProductSerializer(product).data).decode(),
+    )
+
+
+def refresh_listings(product_ids=None, batch_size=1000):
+    """
+    Re-renders the listings of the given products (all products if None)
+    with one read and one upsert per batch. Returns the number refreshed.
+    """
+    products = Product.objects.select_related('category').order_by('id')
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+
+    refreshed = 0
+    batch = []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(_build_listing(product))
+        if len(batch) >= batch_size:
+            refreshed += _upsert(batch)
+            batch = []
+    if batch:
+        refreshed += _upsert(batch)
+    return refreshed
+
+
+def _upsert(listings):
+    ProductListing.objects.bulk_create(
+        listings, update_conflicts=True, unique_fields=['product'], update_fields=LISTING_FIELDS
+    )
+    return len(listings)
+
+
+def render_list(fragments):
+    return '[' + ','.join(fragments) + ']'
+
+
+def render_page(paginator, fragments):
+    """
+    Renders a PageNumberPagination envelope around stored JSON fragments.
+    """
+    return (
+        '{"count":' + json.dumps(paginator.page.paginator.count)
+        + ',"next":' + json.dumps(paginator.get_next_link())
+        + ',"previous":' + json.dumps(paginator.get_previous_link())
+        + ',"results":' + render_list(fragments) + '}'
+    )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from products.listings import refresh_listings
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the ProductListing read model used by the public catalog API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        refreshed = refresh_listings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {refreshed} product listing(s)."))
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+
+def fill_listings(apps, schema_editor):
+    # Builds the listings of the existing products, rendered the way
+    # ProductSerializer rendered them when this migration was written.
+    Product = apps.get_model('products', 'Product')
+    ProductListing = apps.get_model('products', 'ProductListing')
+
+    class ProductSerializer(serializers.ModelSerializer):
+        class Meta:
+            model = Product
+            fields = ['id', 'name', 'description', 'price', 'stock', 'category', 'created_at', 'updated_at']
+
+    renderer = JSONRenderer()
+    batch = []
+    for product in Product.objects.select_related('category').order_by('id').iterator(chunk_size=1000):
+        batch.append(ProductListing(
+            product=product,
+            category_name=product.category.name,
+            price=product.price,
+            stock=product.stock,
+            updated_at=product.updated_at,
+            data=renderer.render(ProductSerializer(product).data).decode(),
+        ))
+        if len(batch) >= 1000:
+            ProductListing.objects.bulk_create(batch)
+            batch = []
+    ProductListing.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='products.product')),
+                ('category_name', models.CharField(db_index=True, max_length=255)),
+                ('price', models.DecimalField(db_index=True, decimal_places=2, max_digits=10)),
+                ('stock', models.IntegerField()),
+                ('updated_at', models.DateTimeField()),
+                ('data', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(fill_listings, migrations.RunPython.noop),
+    ]
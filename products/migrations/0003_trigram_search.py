@@ -0,0 +1,16 @@
+from django.db import migrations
+
+from ecom_project.migration_operations import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_productlisting'),
+        # Creates the pg_trgm extension.
+        ('users', '0003_trigram_search'),
+    ]
+
+    operations = [
+        AddTrigramIndex(model_name='product', field_name='name', name='products_product_name_trgm'),
+    ]
@@ -20,4 +20,18 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+# Denormalized read model behind the public catalog API: one row per product with
+# its pre-rendered JSON and the columns the public filters need. Kept in sync by
+# products/listings.py; rebuild it with `python manage.py rebuild_catalog`.
+class ProductListing(models.Model):
+    product = models.OneToOneField(Product, primary_key=True, on_delete=models.CASCADE, related_name='listing')
+    category_name = models.CharField(max_length=255, db_index=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
+    stock = models.IntegerField()
+    updated_at = models.DateTimeField()
+    data = models.TextField()
+
+    def __str__(self):
+        return f"Listing for product {self.product_id}"
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .listings import refresh_listings
+from .models import Category, Product, ProductListing
+from .snapshots import invalidate_snapshots
+
+
+# Keep the public catalog read model in step with admin edits.
+# Bulk stock updates (checkout, cancel) refresh it through the outbox instead.
+@receiver(post_save, sender=Product)
+def refresh_product_listing(sender, instance, **kwargs):
+    refresh_listings([instance.id])
+
+
+@receiver(post_save, sender=Category)
+def rename_category_listings(sender, instance, created, **kwargs):
+    if not created:
+        ProductListing.objects.filter(product__category=instance).update(
+            category_name=instance.name, updated_at=timezone.now()
+        )
+
+
+# Cart validation reads cached price/stock snapshots; drop them when a product changes.
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_snapshot(sender, instance, **kwargs):
+    invalidate_snapshots([instance.id])
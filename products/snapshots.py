@@ -0,0 +1,135 @@
+"""
+A compact price/stock lookup for cart validation.
+
+Cart endpoints only need a product's price and stock to validate a request,
+so they read ``ProductSnapshot`` tuples here instead of loading the whole
+``Product`` row. Snapshots are kept in two tiers: a small per-process LRU
+with a TTL, backed by the shared Django cache, with the database
+(``values_list('id', 'price', 'stock')``) as the fallback.
+
+Every product has a version stamp in the shared cache. Writes that change
+price or stock call ``invalidate_snapshots``, which gives the products new
+stamps; each lookup reads the current stamps in one ``get_many`` call and
+ignores cached snapshots taken under an older one. Snapshots can still be
+up to ``PRODUCT_SNAPSHOT_TTL_SECONDS`` stale if a stamp is lost, so anything
+that must be exact (placing holds, checkout) re-reads stock under a row lock.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Product
+
+ProductSnapshot = namedtuple('ProductSnapshot', ['id', 'price', 'stock'])
+
+
+def _version_key(product_id):
+    return f'product-snapshot:version:{product_id}'
+
+
+def _snapshot_key(product_id, version):
+    return f'product-snapshot:{product_id}:{version}'
+
+
+class LocalSnapshotCache:
+    """
+    A thread-safe LRU of (version, expires_at, snapshot) entries keyed by product id.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, product_id, version):
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return None
+            entry_version, expires_at, snapshot = entry
+            if entry_version != version or expires_at <= time.monotonic():
+                del self._entries[product_id]
+                return None
+            self._entries.move_to_end(product_id)
+            return snapshot
+
+    def set(self, product_id, version, snapshot, timeout):
+        with self._lock:
+            self._entries[product_id] = (version, time.monotonic() + timeout, snapshot)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalSnapshotCache(settings.PRODUCT_SNAPSHOT_LOCAL_SIZE)
+
+
+def get_snapshots(product_ids):
+    """
+    Returns {product_id: ProductSnapshot} for the given ids. Unknown ids are left out.
+    """
+    timeout = settings.PRODUCT_SNAPSHOT_TTL_SECONDS
+    product_ids = set(product_ids)
+    stamps = cache.get_many([_version_key(product_id) for product_id in product_ids])
+    versions = {product_id: stamps.get(_version_key(product_id), 0) for product_id in product_ids}
+
+    snapshots = {}
+    for product_id, version in versions.items():
+        snapshot = local_cache.get(product_id, version)
+        if snapshot is not None:
+            snapshots[product_id] = snapshot
+
+    missing = product_ids - snapshots.keys()
+    if missing:
+        shared = cache.get_many([_snapshot_key(product_id, versions[product_id]) for product_id in missing])
+        for product_id in missing:
+            stored = shared.get(_snapshot_key(product_id, versions[product_id]))
+            if stored is not None:
+                snapshots[product_id] = ProductSnapshot(*stored)
+                local_cache.set(product_id, versions[product_id], snapshots[product_id], timeout)
+
+    missing = product_ids - snapshots.keys()
+    if missing:
+        loaded = {
+            row[0]: ProductSnapshot(*row)
+            for row in Product.objects.filter(id__in=missing).values_list('id', 'price', 'stock')
+        }
+        cache.set_many(
+            {_snapshot_key(product_id, versions[product_id]): tuple(snapshot) for product_id, snapshot in loaded.items()},
+            timeout
+        )
+        for product_id, snapshot in loaded.items():
+            local_cache.set(product_id, versions[product_id], snapshot, timeout)
+        snapshots.update(loaded)
+
+    return snapshots
+
+
+def get_snapshot(product_id):
+    """
+    Returns the ProductSnapshot for one product, or None if it does not exist.
+    """
+    return get_snapshots([product_id]).get(product_id)
+
+
+def invalidate_snapshots(product_ids):
+    """
+    Gives the products new version stamps, now and again once the current
+    transaction commits, so a snapshot read before the commit is not reused.
+    """
+    product_ids = list(product_ids)
+
+    def bump():
+        stamp = time.time_ns()
+        cache.set_many({_version_key(product_id): stamp for product_id in product_ids}, None)
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,7 @@
+from outbox.queue import register
+from .listings import refresh_listings
+
+
+@register('catalog.refresh')
+def refresh_catalog_listings(payload):
+    refresh_listings(payload['product_ids'])
@@ -1,3 +1,225 @@
-from django.test import TestCase
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from django.utils import timezone
+
+from django.apps import apps
+from django.core.management import call_command
+from django.urls import reverse
+
+from ecom_project.testing import QueryBudgetTestCase, create_catalog, create_user
+from products import snapshots
+from products.listings import LISTING_FIELDS, refresh_listings
+from products.models import Category, Product, ProductListing
+from products.snapshots import get_snapshot, get_snapshots, invalidate_snapshots
+
+
+class PublicCatalogBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=10, products_per_category=50)
+
+    def test_product_list(self):
+        response = self.assertWithinBudget('public-product-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 500)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_product_list_last_page(self):
+        response = self.assertWithinBudget('public-product-list', 'GET', query_params={'page': 50})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][-1]['id'], self.products[-1].id)
+
+    def test_product_list_with_filters(self):
+        response = self.assertWithinBudget('public-product-list', 'GET', query_params={
+            'category': 'category 3',
+            'min_price': '10',
+            'max_price': '30',
+            'in_stock': 'true',
+        })
+        self.assertEqual(response.status_code, 200)
+        category = Category.objects.get(name='Category 3')
+        for product in response.json()['results']:
+            self.assertEqual(product['category'], category.id)
+            self.assertTrue(10 <= float(product['price']) <= 30)
+
+    def test_product_list_without_matches(self):
+        response = self.assertWithinBudget('public-product-list', 'GET', query_params={'in_stock': 'false'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_product_list_conditional_get(self):
+        etag = self.assertWithinBudget('public-product-list', 'GET')['ETag']
+        response = self.assertWithinBudget('public-product-list', 'GET', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        Product.objects.filter(id=self.products[0].id).update(stock=7, updated_at=timezone.now())
+        refresh_listings([self.products[0].id])
+        response = self.assertWithinBudget('public-product-list', 'GET', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_detail_conditional_get(self):
+        product = self.products[5]
+        first = self.assertWithinBudget('public-product-detail', 'GET', url_kwargs={'pk': product.id})
+        response = self.assertWithinBudget(
+            'public-product-detail', 'GET', url_kwargs={'pk': product.id},
+            headers={'If-Modified-Since': first['Last-Modified']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_product_detail(self):
+        product = self.products[123]
+        response = self.assertWithinBudget('public-product-detail', 'GET', url_kwargs={'pk': product.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], product.name)
+
+
+class AdminCatalogBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=10, products_per_category=50)
+        cls.admin = create_user('admin@example.com', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.admin)
+
+    def test_category_list(self):
+        response = self.assertWithinBudget('admin-category-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 10)
+
+    def test_category_create(self):
+        response = self.assertWithinBudget('admin-category-list', 'POST', data={'name': 'Books'})
+        self.assertEqual(response.status_code, 201)
+
+    def test_category_retrieve_and_update(self):
+        category = Category.objects.first()
+        response = self.assertWithinBudget('admin-category-detail', 'GET', url_kwargs={'pk': category.id})
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget(
+            'admin-category-detail', 'PATCH', url_kwargs={'pk': category.id}, data={'description': 'Updated'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_list(self):
+        response = self.assertWithinBudget('admin-product-list', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 500)
+
+    def test_product_create(self):
+        response = self.assertWithinBudget('admin-product-list', 'POST', data={
+            'name': 'Laptop',
+            'description': 'A cool laptop',
+            'price': '1299.99',
+            'stock': 10,
+            'category': self.products[0].category_id,
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_product_retrieve_update_and_delete(self):
+        product = self.products[0]
+        response = self.assertWithinBudget('admin-product-detail', 'GET', url_kwargs={'pk': product.id})
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget(
+            'admin-product-detail', 'PATCH', url_kwargs={'pk': product.id}, data={'stock': 5}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.assertWithinBudget('admin-product-detail', 'DELETE', url_kwargs={'pk': product.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Product.objects.filter(id=product.id).exists())
+        self.assertFalse(ProductListing.objects.filter(product_id=product.id).exists())
+
+    def test_admin_edits_reach_the_public_catalog(self):
+        product = self.products[0]
+        self.client.patch(reverse('admin-product-detail', kwargs={'pk': product.id}), {'price': '5.00'}, format='json')
+        self.client.patch(reverse('admin-category-detail', kwargs={'pk': product.category_id}), {'name': 'Renamed'}, format='json')
+
+        self.client.credentials()
+        response = self.client.get(reverse('public-product-detail', kwargs={'pk': product.id}))
+        self.assertEqual(response.json()['price'], '5.00')
+        response = self.client.get(reverse('public-product-list'), {'category': 'renamed'})
+        self.assertEqual(response.json()['count'], 50)
+
+
+class ProductAdminTests(QueryBudgetTestCase):
+    """
+    Admin pages over the large products table must not count or load rows one at a time.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=5, products_per_category=40)
+        cls.admin = create_user('admin@example.com', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def test_changelist(self):
+        self.assertPageQueries(reverse('admin:products_product_changelist'), 5)
+        self.assertPageQueries(reverse('admin:products_product_changelist'), 5, {'q': 'product 1'})
+
+    def test_change_form(self):
+        self.assertPageQueries(reverse('admin:products_product_change', args=[self.products[0].id]), 7)
+
+
+class RebuildCatalogCommandTests(QueryBudgetTestCase):
+    def test_rebuild_restores_missing_and_stale_listings(self):
+        products = create_catalog(categories=2, products_per_category=5)
+        ProductListing.objects.filter(product_id=products[0].id).delete()
+        Product.objects.filter(id=products[1].id).update(stock=0)
+
+        call_command('rebuild_catalog', batch_size=3, stdout=StringIO())
+
+        self.assertEqual(ProductListing.objects.count(), 10)
+        self.assertEqual(ProductListing.objects.get(product_id=products[1].id).stock, 0)
+
+
+class ProductListingMigrationTests(QueryBudgetTestCase):
+    values = ['product_id', *LISTING_FIELDS]
+
+    def test_migration_fills_listings_like_refresh_listings(self):
+        products = create_catalog(categories=2, products_per_category=3)
+        expected = list(ProductListing.objects.order_by('product_id').values_list(*self.values))
+        ProductListing.objects.all().delete()
+
+        import_module('products.migrations.0002_productlisting').fill_listings(apps, None)
+
+        self.assertEqual(len(expected), len(products))
+        self.assertEqual(list(ProductListing.objects.order_by('product_id').values_list(*self.values)), expected)
+
+
+class ProductSnapshotTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, products_per_category=5, stock=10)
+
+    def test_warm_lookups_skip_the_database(self):
+        ids = [product.id for product in self.products]
+        with self.assertNumQueries(1):
+            self.assertEqual(get_snapshots(ids)[ids[0]].stock, 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_snapshots(ids)), 5)
+
+        # The shared tier serves other processes, whose local LRU starts empty.
+        snapshots.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_snapshot(ids[1]).price, self.products[1].price)
+
+    def test_unknown_products_have_no_snapshot(self):
+        self.assertIsNone(get_snapshot(10 ** 9))
+
+    def test_product_saves_invalidate_snapshots(self):
+        product = self.products[0]
+        self.assertEqual(get_snapshot(product.id).stock, 10)
+        product.stock = 3
+        product.save()
+        self.assertEqual(get_snapshot(product.id).stock, 3)
+
+    def test_bulk_stock_updates_invalidate_snapshots(self):
+        product = self.products[0]
+        self.assertEqual(get_snapshot(product.id).stock, 10)
+        Product.objects.filter(id=product.id).update(stock=0)
+        self.assertEqual(get_snapshot(product.id).stock, 10)
+        invalidate_snapshots([product.id])
+        self.assertEqual(get_snapshot(product.id).stock, 0)
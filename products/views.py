@@ -1,13 +1,18 @@
+from django.http import HttpResponse
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.response import Response
-from .models import Category, Product
+from .models import Category, Product, ProductListing
 from .serializers import CategorySerializer, ProductSerializer
-from .filters import ProductFilter
+from .filters import ProductListingFilter
+from .listings import render_list, render_page
+from ecom_project.db_routers import ReplicaReadMixin, PrimaryStickyMixin
+from ecom_project.throttling import CatalogThrottle, ThrottleFirstMixin
+from ecom_project.conditional import collection_validators, make_etag, not_modified_response, set_validators
 
 
 
 # A ViewSet for Categories, accessible only to admin users
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(PrimaryStickyMixin, viewsets.ModelViewSet):
     """
     Admin-only ViewSet for managing Categories.
     - list: GET /api/admin/categories/
@@ -24,7 +29,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 # A ViewSet for Products, accessible only to admin users
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(PrimaryStickyMixin, viewsets.ModelViewSet):
     """
     Admin-only ViewSet for managing Products.
     - list: GET /api/admin/products/
@@ -50,45 +55,70 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 
-# Generic API views for listing and retrieving products to be used by all users
+# Generic API views for listing and retrieving products to be used by all users.
+# They read from the ProductListing read model and return its stored JSON as-is.
 
-class ProductListView(generics.ListAPIView):
+def _json_response(content):
+    return HttpResponse(content, content_type='application/json')
+
+
+class ProductListView(ThrottleFirstMixin, ReplicaReadMixin, generics.ListAPIView):
     """
     Public API view to list all available products.
-    Supports filtering and pagination.
+    Supports filtering and pagination. Reads are served from the replica.
+    Rate limited per IP address (the 'catalog' throttle scope).
     - list: GET /api/products/
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [CatalogThrottle]
     serializer_class = ProductSerializer
-    filterset_class = ProductFilter
+    filterset_class = ProductListingFilter
 
     def get_queryset(self):
-        return Product.objects.select_related('category').all().order_by('id')
+        return ProductListing.objects.all().order_by('product_id')
 
     #overriding the list method to message if no products are found
+    # and to answer conditional requests (If-None-Match / If-Modified-Since) with a 304
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
-        if not queryset.exists():
+        count, last_modified = collection_validators(queryset)
+        if not count:
             return Response(
                 {"detail": "No products found matching your criteria."},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        page = self.paginate_queryset(queryset)
+        etag = make_etag(request, count, last_modified)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        fragments = queryset.values_list('data', flat=True)
+        page = self.paginate_queryset(fragments)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return set_validators(_json_response(render_page(self.paginator, page)), etag, last_modified)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return set_validators(_json_response(render_list(fragments)), etag, last_modified)
 
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(ThrottleFirstMixin, ReplicaReadMixin, generics.RetrieveAPIView):
     """
     Public API view to retrieve a single product by its ID.
+    Reads are served from the replica. Supports conditional requests.
+    Rate limited per IP address (the 'catalog' throttle scope).
     - retrieve: GET /api/products/{id}/
     """
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [CatalogThrottle]
     serializer_class = ProductSerializer
-    queryset = Product.objects.select_related('category').all()
\ No newline at end of file
+    queryset = ProductListing.objects.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        listing = self.get_object()
+        etag = make_etag(request, listing.updated_at)
+        not_modified = not_modified_response(request, etag, listing.updated_at)
+        if not_modified is not None:
+            return not_modified
+
+        return set_validators(_json_response(listing.data), etag, listing.updated_at)
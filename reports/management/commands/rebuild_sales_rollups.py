@@ -0,0 +1,40 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from carts.models import ArchivedOrder, Order
+from reports.rollups import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily sales rollups behind the admin sales report."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=datetime.date.fromisoformat,
+                            help="First day to rebuild (YYYY-MM-DD). Defaults to the first order.")
+        parser.add_argument('--end', type=datetime.date.fromisoformat,
+                            help="Last day to rebuild (YYYY-MM-DD). Defaults to the last order.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        bounds = [
+            model.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+            for model in (Order, ArchivedOrder)
+        ]
+        firsts = [bound['first'] for bound in bounds if bound['first'] is not None]
+        lasts = [bound['last'] for bound in bounds if bound['last'] is not None]
+        if not firsts:
+            self.stdout.write("There are no orders to roll up.")
+            return
+
+        start = options['start'] or timezone.localdate(min(firsts))
+        end = options['end'] or timezone.localdate(max(lasts))
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        categories, products = rebuild_daily_sales(start, end, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt sales rollups from {start} to {end}: {categories} category row(s), {products} product row(s)."
+        ))
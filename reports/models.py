@@ -0,0 +1,36 @@
+from django.db import models
+
+from products.models import Category, Product
+
+# Daily sales rollups, maintained from Order/OrderItem by reports.rollups.
+# Cancelled orders are not counted. Dates are in the project's TIME_ZONE.
+
+class DailyCategorySales(models.Model):
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.PositiveIntegerField()
+    units = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='reports_daily_category_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id} sales on {self.date}: {self.revenue}"
+
+
+class DailyProductSales(models.Model):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    units = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='reports_daily_product_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} sales on {self.date}: {self.revenue}"
@@ -0,0 +1,139 @@
+"""
+Maintenance of the daily sales rollup tables.
+
+Rollups are kept current incrementally: placing an order queues a
+'sales.rollup' outbox task that adds that one order's lines to its day's
+rows, and cancelling it queues one that subtracts them again (see
+reports/tasks.py). Each task costs the same however many orders the day
+already has. The rows are changed with ``UPDATE ... SET x = x + delta``, so
+workers applying orders for the same day concurrently do not overwrite each
+other, and a cancellation waits until the order's placement was applied.
+
+``rebuild_daily_sales`` recomputes a range from scratch, from the order lines,
+live and archived, with a ``GROUP BY``; ``manage.py rebuild_sales_rollups``
+uses it to backfill or repair the tables.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from carts.models import ArchivedOrderItem, Order, OrderItem
+from .models import DailyCategorySales, DailyProductSales
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _aggregate(items, start, end):
+    """
+    Returns per-(day, category) and per-(day, product) totals for order lines
+    whose order was placed between ``start`` and ``end``, excluding cancelled orders.
+    """
+    # A range on created_at, not created_at__date, so the index on it can be used.
+    items = (
+        items
+        .filter(order__created_at__gte=_day_start(start), order__created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+        .exclude(order__status=Order.OrderStatus.CANCELLED)
+        .annotate(day=TruncDate('order__created_at'))
+        .order_by()
+    )
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    by_category = items.values('day', 'product__category_id').annotate(
+        orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=revenue
+    )
+    by_product = items.values('day', 'product_id').annotate(units=Sum('quantity'), revenue=revenue)
+    return by_category, by_product
+
+
+def rebuild_daily_sales(start, end, batch_size=1000):
+    """
+    Recomputes the rollups for every day from ``start`` to ``end`` inclusive,
+    from both live and archived orders (an order is only ever in one of them).
+    Returns the number of (category rows, product rows) written.
+    """
+    categories = defaultdict(lambda: [0, 0, Decimal('0')])
+    products = defaultdict(lambda: [0, Decimal('0')])
+    for items in (OrderItem.objects.all(), ArchivedOrderItem.objects.all()):
+        by_category, by_product = _aggregate(items, start, end)
+        for row in by_category:
+            totals = categories[row['day'], row['product__category_id']]
+            totals[0] += row['orders']
+            totals[1] += row['units']
+            totals[2] += row['revenue']
+        for row in by_product:
+            totals = products[row['day'], row['product_id']]
+            totals[0] += row['units']
+            totals[1] += row['revenue']
+
+    category_rows = [
+        DailyCategorySales(date=day, category_id=category_id, orders=orders, units=units, revenue=revenue)
+        for (day, category_id), (orders, units, revenue) in categories.items()
+    ]
+    product_rows = [
+        DailyProductSales(date=day, product_id=product_id, units=units, revenue=revenue)
+        for (day, product_id), (units, revenue) in products.items()
+    ]
+
+    with transaction.atomic():
+        DailyCategorySales.objects.filter(date__range=(start, end)).delete()
+        DailyProductSales.objects.filter(date__range=(start, end)).delete()
+        DailyCategorySales.objects.bulk_create(category_rows, batch_size=batch_size)
+        DailyProductSales.objects.bulk_create(product_rows, batch_size=batch_size)
+    return len(category_rows), len(product_rows)
+
+
+def _order_lines(order_id):
+    revenue = Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    for items in (OrderItem.objects.all(), ArchivedOrderItem.objects.all()):
+        lines = list(
+            items.filter(order_id=order_id)
+            .values('product_id', 'product__category_id')
+            .annotate(units=Sum('quantity'), revenue=revenue)
+            .order_by('product_id')
+        )
+        if lines:
+            return lines
+    return []
+
+
+def apply_order(order_id, day, sign=1):
+    """
+    Adds one order's lines to the rollups for ``day`` (sign=1), or takes
+    them out again (sign=-1) when the order is cancelled.
+    """
+    lines = _order_lines(order_id)
+    categories = defaultdict(lambda: [0, Decimal('0')])
+    for line in lines:
+        totals = categories[line['product__category_id']]
+        totals[0] += line['units']
+        totals[1] += line['revenue']
+
+    with transaction.atomic():
+        # Make sure every row exists, then change it in place. Rows are updated
+        # in id order so concurrent workers lock them in the same order.
+        DailyCategorySales.objects.bulk_create(
+            [DailyCategorySales(date=day, category_id=category_id, orders=0, units=0, revenue=0)
+             for category_id in sorted(categories)],
+            ignore_conflicts=True
+        )
+        DailyProductSales.objects.bulk_create(
+            [DailyProductSales(date=day, product_id=line['product_id'], units=0, revenue=0) for line in lines],
+            ignore_conflicts=True
+        )
+        for category_id, (units, revenue) in sorted(categories.items()):
+            DailyCategorySales.objects.filter(date=day, category_id=category_id).update(
+                orders=F('orders') + sign,
+                units=F('units') + sign * units,
+                revenue=F('revenue') + sign * revenue,
+            )
+        for line in lines:
+            DailyProductSales.objects.filter(date=day, product_id=line['product_id']).update(
+                units=F('units') + sign * line['units'],
+                revenue=F('revenue') + sign * line['revenue'],
+            )
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+
+class CategorySalesSerializer(serializers.Serializer):
+    date = serializers.DateField()
+    category_id = serializers.IntegerField()
+    category = serializers.CharField(source='category__name')
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class ProductSalesSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    product = serializers.CharField(source='product__name')
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    top = serializers.IntegerField(required=False, default=10, min_value=1, max_value=100)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return attrs
@@ -0,0 +1,26 @@
+"""
+Background work for the sales reports, run by the outbox worker.
+"""
+import datetime
+
+from outbox.models import OutboxTask
+from outbox.queue import Defer, register
+from .rollups import apply_order
+
+
+def _placement_pending(order_id):
+    return OutboxTask.objects.filter(
+        topic='sales.rollup',
+        payload__order_id=order_id,
+        payload__sign=1,
+        status__in=[OutboxTask.TaskStatus.PENDING, OutboxTask.TaskStatus.RUNNING],
+    ).exists()
+
+
+@register('sales.rollup')
+def update_daily_sales(payload):
+    # An order is only taken out of the rollups after it was put in: the
+    # counters cannot go below zero, and a retried placement may run late.
+    if payload['sign'] < 0 and _placement_pending(payload['order_id']):
+        raise Defer(f"order {payload['order_id']} is not in the rollups yet")
+    apply_order(payload['order_id'], datetime.date.fromisoformat(payload['day']), sign=payload['sign'])
@@ -0,0 +1,135 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from carts.models import Order
+from ecom_project.testing import QueryBudgetTestCase, create_catalog, create_order_history, create_user, fill_cart
+from outbox.models import OutboxTask
+from outbox.queue import process_batch
+from reports.models import DailyCategorySales, DailyProductSales
+
+
+class SalesReportTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=3, products_per_category=10)
+        cls.admin = create_user('admin@example.com', is_staff=True)
+        cls.user = create_user('buyer@example.com')
+        cls.orders = create_order_history(cls.user, cls.products, orders=40, items_per_order=3)
+        # Spread the orders over the last 20 days, two per day.
+        today = timezone.now()
+        for n, order in enumerate(cls.orders):
+            Order.objects.filter(id=order.id).update(created_at=today - datetime.timedelta(days=n // 2))
+        Order.objects.filter(id=cls.orders[0].id).update(status=Order.OrderStatus.CANCELLED)
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate(self.admin)
+
+    def test_rebuild_and_report(self):
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(DailyCategorySales.objects.dates('date', 'day').count(), 20)
+
+        response = self.assertWithinBudget('sales-report', 'GET', query_params={'top': 5})
+        self.assertEqual(response.status_code, 200)
+        # Every order item was priced at its product's price; the cancelled order is left out.
+        expected = sum(
+            item.price * item.quantity
+            for order in Order.objects.exclude(status=Order.OrderStatus.CANCELLED).prefetch_related('items')
+            for item in order.items.all()
+        )
+        self.assertEqual(sum(Decimal(row['revenue']) for row in response.data['revenue_by_day']), expected)
+        self.assertEqual(len(response.data['top_products']), 5)
+        revenues = [Decimal(row['revenue']) for row in response.data['top_products']]
+        self.assertEqual(revenues, sorted(revenues, reverse=True))
+
+    def test_archived_orders_stay_in_the_rollups(self):
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        before = self.client.get(reverse('sales-report')).data
+        Order.objects.filter(id__in=[order.id for order in self.orders[1:]]).update(status=Order.OrderStatus.DELIVERED)
+        call_command('archive_orders', older_than_days=0, stdout=StringIO())
+        self.assertFalse(Order.objects.exists())
+
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        self.assertEqual(self.client.get(reverse('sales-report')).data, before)
+
+    def test_report_range(self):
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        today = timezone.localdate()
+        response = self.assertWithinBudget('sales-report', 'GET', query_params={
+            'start': (today - datetime.timedelta(days=1)).isoformat(),
+            'end': today.isoformat(),
+        })
+        self.assertEqual({row['date'] for row in response.data['revenue_by_day']},
+                         {today.isoformat(), (today - datetime.timedelta(days=1)).isoformat()})
+
+        response = self.client.get(reverse('sales-report'), {'start': today.isoformat(), 'end': '2000-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_report_is_admin_only(self):
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get(reverse('sales-report')).status_code, 403)
+
+    def test_checkout_and_cancel_update_the_rollups(self):
+        self.authenticate(self.user)
+        product = self.products[-1]
+        fill_cart(self.user, [product], quantity=2)
+        order_id = self.client.post(reverse('order-create')).data['id']
+        process_batch()
+        today = timezone.localdate()
+        row = DailyProductSales.objects.get(date=today, product=product)
+        self.assertEqual((row.units, row.revenue), (2, product.price * 2))
+
+        self.client.post(reverse('order-cancel', kwargs={'pk': order_id}))
+        process_batch()
+        row = DailyProductSales.objects.get(date=today, product=product)
+        self.assertEqual((row.units, row.revenue), (0, 0))
+
+    def test_a_cancellation_waits_for_the_placement(self):
+        self.authenticate(self.user)
+        product = self.products[-1]
+        fill_cart(self.user, [product], quantity=2)
+        order_id = self.client.post(reverse('order-create')).data['id']
+        # The placement failed once and is waiting for its retry when the order is cancelled.
+        placement = OutboxTask.objects.get(topic='sales.rollup', payload__order_id=order_id)
+        OutboxTask.objects.filter(id=placement.id).update(available_at=timezone.now() + datetime.timedelta(minutes=1))
+        self.client.post(reverse('order-cancel', kwargs={'pk': order_id}))
+        cancellation = OutboxTask.objects.get(topic='sales.rollup', payload__order_id=order_id, payload__sign=-1)
+
+        process_batch()
+        cancellation.refresh_from_db()
+        self.assertEqual((cancellation.status, cancellation.attempts), (OutboxTask.TaskStatus.PENDING, 0))
+        self.assertFalse(DailyProductSales.objects.filter(product=product).exists())
+
+        OutboxTask.objects.filter(topic='sales.rollup').update(available_at=timezone.now())
+        process_batch()
+        row = DailyProductSales.objects.get(date=timezone.localdate(), product=product)
+        self.assertEqual((row.units, row.revenue), (0, 0))
+
+    def test_orders_are_applied_incrementally(self):
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        today = timezone.localdate()
+        category_id = self.products[0].category_id
+        before = DailyCategorySales.objects.get(date=today, category_id=category_id)
+        untouched = list(DailyCategorySales.objects.exclude(date=today).values_list('id', 'revenue'))
+
+        self.authenticate(self.user)
+        fill_cart(self.user, self.products[:2], quantity=3)
+        self.client.post(reverse('order-create'))
+        process_batch()
+
+        after = DailyCategorySales.objects.get(date=today, category_id=category_id)
+        self.assertEqual(after.orders, before.orders + 1)
+        self.assertEqual(after.units, before.units + 6)
+        self.assertEqual(after.revenue, before.revenue + 3 * (self.products[0].price + self.products[1].price))
+        self.assertEqual(list(DailyCategorySales.objects.exclude(date=today).values_list('id', 'revenue')), untouched)
+
+        # The incremental totals match a full recomputation.
+        totals = list(DailyCategorySales.objects.order_by('date', 'category_id').values_list('orders', 'units', 'revenue'))
+        call_command('rebuild_sales_rollups', stdout=StringIO())
+        rebuilt = list(DailyCategorySales.objects.order_by('date', 'category_id').values_list('orders', 'units', 'revenue'))
+        self.assertEqual(totals, rebuilt)
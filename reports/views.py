@@ -0,0 +1,46 @@
+import datetime
+
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ecom_project.db_routers import ReplicaReadMixin
+from .models import DailyCategorySales, DailyProductSales
+from .serializers import CategorySalesSerializer, ProductSalesSerializer, SalesReportQuerySerializer
+
+DEFAULT_REPORT_DAYS = 30
+
+
+class SalesReportView(ReplicaReadMixin, APIView):
+    """
+    Admin-only sales report, read from the daily rollup tables.
+    Accepts ?start=YYYY-MM-DD&end=YYYY-MM-DD (the last 30 days by default) and ?top=N.
+    - get: GET /api/admin/reports/sales/
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        end = query.validated_data.get('end') or timezone.localdate()
+        start = query.validated_data.get('start') or end - datetime.timedelta(days=DEFAULT_REPORT_DAYS - 1)
+
+        revenue_by_day = (
+            DailyCategorySales.objects.filter(date__range=(start, end))
+            .order_by('date', 'category_id')
+            .values('date', 'category_id', 'category__name', 'orders', 'units', 'revenue')
+        )
+        top_products = (
+            DailyProductSales.objects.filter(date__range=(start, end))
+            .values('product_id', 'product__name')
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'product_id')[:query.validated_data['top']]
+        )
+        return Response({
+            'start': start,
+            'end': end,
+            'revenue_by_day': CategorySalesSerializer(revenue_by_day, many=True).data,
+            'top_products': ProductSalesSerializer(top_products, many=True).data,
+        })
@@ -1,12 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from ecom_project.admin_tools import EstimatedCountPaginator
 from .models import User
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('email', 'name', 'is_staff', 'is_active',)
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups',)
+    # Both fields are trigram-indexed on PostgreSQL (users/migrations/0003_trigram_search.py).
     search_fields = ('email', 'name',)
     ordering = ('email',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
     fieldsets = (
@@ -0,0 +1,17 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from ecom_project.migration_operations import AddTrigramIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddTrigramIndex(model_name='user', field_name='email', name='users_user_email_trgm'),
+        AddTrigramIndex(model_name='user', field_name='name', name='users_user_name_trgm'),
+    ]
@@ -1,3 +1,65 @@
-from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
 
-# Create your tests here.
+from ecom_project.testing import QueryBudgetTestCase, create_user
+from users.models import User
+
+
+class UserBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user@example.com', password='Secret123!')
+
+    def test_register(self):
+        response = self.assertWithinBudget('user-register', 'POST', data={
+            'email': 'new@example.com',
+            'password': 'SomeSecurePassword123',
+            'name': 'New User',
+            'phone': '1234567890',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.filter(email='new@example.com').exists())
+
+    def test_profile(self):
+        self.authenticate(self.user)
+        response = self.assertWithinBudget('user-profile', 'GET')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['email'], self.user.email)
+        response = self.assertWithinBudget('user-profile', 'PATCH', data={'address': '1 Main Street'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_logout(self):
+        self.authenticate(self.user)
+        refresh = RefreshToken.for_user(self.user)
+        response = self.assertWithinBudget('user-logout', 'POST', data={'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 205)
+
+
+class TokenBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user@example.com', password='Secret123!')
+
+    def test_obtain_pair(self):
+        response = self.assertWithinBudget('token_obtain_pair', 'POST', data={
+            'email': 'user@example.com',
+            'password': 'Secret123!',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+
+    def test_refresh(self):
+        refresh = RefreshToken.for_user(self.user)
+        response = self.assertWithinBudget('token_refresh', 'POST', data={'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_verify(self):
+        token = RefreshToken.for_user(self.user).access_token
+        response = self.assertWithinBudget('token_verify', 'POST', data={'token': str(token)})
+        self.assertEqual(response.status_code, 200)
+
+
+class UserAdminTests(QueryBudgetTestCase):
+    def test_changelist_search(self):
+        self.client.force_login(create_user('admin@example.com', is_staff=True))
+        self.assertPageQueries(reverse('admin:users_user_changelist'), 5, {'q': 'admin'})
@@ -2,17 +2,19 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import generics, permissions
+from ecom_project.throttling import RegistrationThrottle, ThrottleFirstMixin
 from .serializers import UserRegistrationSerializer, UserProfileSerializer
 
 
 # API view for user registration using Django REST Framework generics
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(ThrottleFirstMixin, generics.CreateAPIView):
     """
-    API view for user registration.
+    API view for user registration. Rate limited per IP address (the 'register' throttle scope).
     - create: POST /api/users/register/ (Register a new user)
     """
     serializer_class = UserRegistrationSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [RegistrationThrottle]
 
 
 